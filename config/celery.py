@@ -0,0 +1,23 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+app = Celery("config")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+
+
+@app.task(bind=True, name="core.run_task")
+def run_task(self, name, args, kwargs):
+    """Run a core.tasks @task by name, retrying with its own backoff policy."""
+    from core.tasks import registry
+
+    task = registry[name]
+    try:
+        return task(*args, **kwargs)
+    except Exception as exc:
+        attempts = self.request.retries + 1
+        if attempts >= task.max_attempts:
+            raise
+        raise self.retry(exc=exc, countdown=task.retry_delay(attempts), max_retries=task.max_attempts - 1)
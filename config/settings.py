@@ -27,6 +27,7 @@ ALLOWED_HOSTS = ["*"]
 # Application definition
 
 INSTALLED_APPS = [
+    "daphne",  # ASGI runserver, needed for WebSockets
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -72,6 +73,20 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
+
+# Pub/sub for real-time chat. In-memory only reaches sockets in the same process;
+# set REDIS_URL (the redis service in hide/docker-compose.yml) for multiple workers.
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+    }
+}
+if os.getenv("REDIS_URL"):
+    CHANNEL_LAYERS["default"] = {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {"hosts": [os.getenv("REDIS_URL")]},
+    }
 
 
 # Database
@@ -92,6 +107,21 @@ DATABASES = {
 # }
 
 
+# Per-process cache by default, where version-keyed caches (public job board,
+# fleet reports) expire their versions within seconds since other workers never
+# see a bump. Set REDIS_URL to share the cache (and its invalidation) across workers.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+if os.getenv("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    }
+
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'  
 EMAIL_HOST = 'smtp.gmail.com'  
 EMAIL_PORT = 587  
@@ -99,6 +129,21 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')  # Gmail address  
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')  # Use an App Password
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+EMAIL_TIMEOUT = 30  # seconds; keeps a hung SMTP server inside the task's visibility timeout
+
+# Background tasks (core/tasks.py): "immediate" (in-process, after commit), or
+# "database" / "celery", which only run tasks if `manage.py runworker` / a Celery
+# worker is running too. Deployments without a worker (Vercel) keep "immediate".
+TASKS_BACKEND = os.getenv("TASKS_BACKEND", "immediate")
+
+# Only used with TASKS_BACKEND = "celery"; see config/celery.py.
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+CELERY_TASK_DEFAULT_QUEUE = "default"  # core.tasks queues: default, uploads
+CELERY_TASK_ACKS_LATE = True  # redeliver tasks whose worker died mid-run
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Unacknowledged messages are redelivered after this long; must exceed any task's run time.
+CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 60 * 60}
 
 #cloudinary settings
 cloudinary.config(
@@ -127,11 +172,13 @@ AUTH_PASSWORD_VALIDATORS = [
 # settings.py
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.ProfileJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.CreatedAtCursorPagination',
+    'PAGE_SIZE': 20,
 }
 
 AUTHENTICATION_BACKENDS = [
@@ -164,6 +211,19 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # Uploads wait here until a worker moves them to "default" (core/uploads.py).
+    # Workers must see the same directory: same host or a shared volume.
+    "staging": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.getenv("UPLOAD_STAGING_ROOT", os.path.join(BASE_DIR, "staging"))},
+    },
+}
+# Processes rendering image derivatives (core/images.py); None means one per CPU.
+IMAGE_PROCESS_WORKERS = None
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -1,6 +1,25 @@
 from django.contrib import admin
 from django.apps import apps
 
+# Joins needed by each model's __str__, so changelists don't issue a query per row.
+LIST_SELECT_RELATED = {
+    'Driver': ('user',),
+    'Client': ('user',),
+    'JobBid': ('driver__user', 'job_post'),
+    'JobOffer': ('accepted_bid__driver__user', 'job_post'),
+    'Payment': ('job_offer__accepted_bid__driver__user', 'job_offer__job_post'),
+    'ChatRoom': ('job_post', 'client__user', 'driver__user'),
+    'ClientDriverChat': ('sender', 'receiver', 'chat_room'),
+    'CarDoc': ('driver__user', 'car'),
+    'Notification': ('user',),
+    'Trip': ('job_offer__job_post',),
+}
+
 app_models = apps.get_app_config('core').get_models()#_your_app_should be called here
 for model in app_models:
-    admin.site.register(model)
+    model_admin = type(
+        f'{model.__name__}Admin',
+        (admin.ModelAdmin,),
+        {'list_select_related': LIST_SELECT_RELATED.get(model.__name__, False)},
+    )
+    admin.site.register(model, model_admin)
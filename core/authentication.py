@@ -0,0 +1,111 @@
+# core/authentication.py
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.utils.functional import SimpleLazyObject, cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .models import Driver, Client
+
+# role -> (token claim, profile model). Profiles use the user as primary key,
+# so the claim value is also the profile's pk.
+PROFILE_CLAIMS = {
+    'driver': ('driver_id', Driver),
+    'client': ('client_id', Client),
+}
+
+
+def profile_from_pk(model, pk):
+    """
+    Build a profile instance without a query. Only the pk is populated; any other
+    column is loaded on first access like a deferred field.
+    """
+    return model.from_db(router.db_for_read(model), ['user_id'], [pk])
+
+
+def attach_profiles(request, user, token):
+    """
+    Resolve the caller's Driver/Client once and expose it as request.driver /
+    request.client. Tokens carrying the profile claim need no lookup at all;
+    older tokens fall back to a single lazy query on first use.
+    """
+    request.driver = None
+    request.client = None
+    role = getattr(user, 'role', None)
+    if role not in PROFILE_CLAIMS:
+        return
+    claim, model = PROFILE_CLAIMS[role]
+    pk = token.get(claim)
+    if pk is not None:
+        profile = profile_from_pk(model, pk)
+    else:
+        user_pk = user.pk
+        profile = SimpleLazyObject(lambda: model.objects.get(pk=user_pk))
+    setattr(request, role, profile)
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that also attaches the request-scoped role profile.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None:
+            return None
+        user, token = result
+        attach_profiles(request, user, token)
+        return user, token
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from JWT claims (user_id, role, username, is_staff,
+    profile ids). Attributes that are not in the token are read from the real
+    CustomUser, which is loaded on first such access and then cached on the
+    instance.
+    """
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.db_user, attr)
+
+    # TokenUser reads these from the token and defaults them to False; tokens
+    # minted before the claims existed fall back to the database.
+    @property
+    def is_staff(self):
+        return self.token['is_staff'] if 'is_staff' in self.token else self.db_user.is_staff
+
+    @property
+    def is_superuser(self):
+        return self.token['is_superuser'] if 'is_superuser' in self.token else self.db_user.is_superuser
+
+    @cached_property
+    def db_user(self):
+        return get_user_model().objects.get(pk=self.pk)
+
+
+class StatelessJWTAuthentication(ProfileJWTAuthentication):
+    """
+    Opt-in variant of ProfileJWTAuthentication for read paths: GET, HEAD and
+    OPTIONS requests trust the token instead of loading CustomUser, so
+    deactivating a user or changing their role only affects their reads once
+    their access token expires. Any other method loads and checks the user like
+    ProfileJWTAuthentication, so a deactivated user can't write.
+    """
+
+    def authenticate(self, request):
+        if request.method not in SAFE_METHODS:
+            return ProfileJWTAuthentication().authenticate(request)
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if jwt_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return ClaimsUser(validated_token)
@@ -0,0 +1,93 @@
+# core/cache.py
+# Cache keys shared between views (readers) and signals (invalidation).
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+USER_INFO_CACHE_TTL = 60  # seconds
+
+PUBLIC_JOBPOSTS_VERSION_KEY = "public-jobposts:version"
+PUBLIC_JOBPOSTS_CACHE_TTL = 300  # seconds; entries are also invalidated by version bumps
+
+# With a per-process cache (LocMem, the default without REDIS_URL) a version bump
+# only reaches the worker that made it, so versions expire after this many
+# seconds instead, bounding how long other workers serve stale pages and 304s.
+LOCAL_VERSION_TTL = 5  # seconds
+_LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+CHAT_PARTICIPANTS_CACHE_TTL = 60 * 60  # seconds; rooms never change hands, deletes invalidate
+
+FLEET_REPORT_VERSION_KEY = "fleet-report:version"
+FLEET_REPORT_CACHE_TTL = 60 * 60  # seconds, for windows that have ended
+FLEET_REPORT_OPEN_CACHE_TTL = 60  # seconds, for windows that include in-progress trips
+
+
+def user_info_cache_key(user_pk):
+    return f"user-info:{user_pk}"
+
+
+def chat_participants_cache_key(chat_id):
+    return f"chat-participants:{chat_id.hex}"
+
+
+def cache_is_shared():
+    """Whether the default cache is shared between processes."""
+    return settings.CACHES["default"]["BACKEND"] not in _LOCAL_CACHE_BACKENDS
+
+
+def _version_timeout():
+    return None if cache_is_shared() else LOCAL_VERSION_TTL
+
+
+def _version(key):
+    # Seeded from the clock so a version lost to eviction or expiry never
+    # collides with one that was handed out before.
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), _version_timeout())
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), _version_timeout())
+
+
+def public_jobposts_version():
+    """Current version of the public job board."""
+    return _version(PUBLIC_JOBPOSTS_VERSION_KEY)
+
+
+def bump_public_jobposts_version():
+    """Invalidate every cached page (and ETag) of the public job board."""
+    _bump_version(PUBLIC_JOBPOSTS_VERSION_KEY)
+
+
+def public_jobposts_cache_ttl():
+    return PUBLIC_JOBPOSTS_CACHE_TTL if cache_is_shared() else LOCAL_VERSION_TTL
+
+
+def public_jobposts_page_key(version, variant):
+    return f"public-jobposts:{version}:{variant}"
+
+
+def fleet_report_version():
+    """Current version of the trip and car data behind fleet reports."""
+    return _version(FLEET_REPORT_VERSION_KEY)
+
+
+def bump_fleet_report_version():
+    """Invalidate every cached fleet report window."""
+    _bump_version(FLEET_REPORT_VERSION_KEY)
+
+
+def fleet_report_cache_key(version, start, end):
+    return f"fleet-report:{version}:{start.isoformat()}:{end.isoformat()}"
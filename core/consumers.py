@@ -0,0 +1,43 @@
+# core/consumers.py
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.http import Http404
+
+from .realtime import chat_group_name
+from .views import participant_room
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws/chatrooms/<chat_id>/?token=<access>
+    Receives every new message of the room as JSON. Sending still goes through
+    the REST API.
+    """
+
+    async def connect(self):
+        user = self.scope["user"]
+        self.chat_id = self.scope["url_route"]["kwargs"]["chat_id"]
+        if not user.is_authenticated or not await self.is_participant(user.pk):
+            await self.close(code=4403)
+            return
+        self.group_name = chat_group_name(self.chat_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        pass  # push-only
+
+    async def chat_message(self, event):
+        await self.send_json(event["message"])
+
+    @database_sync_to_async
+    def is_participant(self, user_pk):
+        try:
+            participant_room(self.chat_id, user_pk)
+        except Http404:
+            return False
+        return True
@@ -0,0 +1,143 @@
+# core/geo.py
+"""
+Geohash grid helpers for radius search without a spatial database extension.
+
+Rows store a geohash of their coordinates in an indexed CharField. A radius query
+turns into a handful of geohash prefix ranges (plain B-tree range scans on any
+backend) plus a lat/lng bounding box; the few surviving candidates are then
+ranked by exact haversine distance in Python.
+"""
+import heapq
+import math
+
+from django.db.models import Q
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ~5m x 5m cells
+EARTH_RADIUS_KM = 6371.0088
+MAX_COVERING_CELLS = 16
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_or_blank(lat, lng):
+    """Geohash for optional coordinates; rows without a location store ''."""
+    if lat is None or lng is None:
+        return ""
+    return encode(lat, lng)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell at the given precision."""
+    bits = precision * 5
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_boxes(lat, lng, radius_km):
+    """
+    [(min_lat, max_lat, min_lng, max_lng), ...] enclosing the circle. A circle
+    that crosses the antimeridian gets one box on each side of it; one that
+    reaches a pole spans every longitude.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    cos_lat = math.cos(math.radians(lat))
+    if min_lat <= -90.0 or max_lat >= 90.0 or cos_lat < 1e-9:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    dlng = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    if dlng >= 180.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    west, east = lng - dlng, lng + dlng
+    if west < -180.0:
+        return [(min_lat, max_lat, -180.0, east), (min_lat, max_lat, west + 360.0, 180.0)]
+    if east > 180.0:
+        return [(min_lat, max_lat, west, 180.0), (min_lat, max_lat, -180.0, east - 360.0)]
+    return [(min_lat, max_lat, west, east)]
+
+
+def covering_prefixes(min_lat, max_lat, min_lng, max_lng, max_cells=MAX_COVERING_CELLS):
+    """The finest set of geohash cells (at most max_cells) that covers the box."""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.ceil((max_lat - min_lat) / height) + 1
+        cols = math.ceil((max_lng - min_lng) / width) + 1
+        if rows * cols > max_cells and precision > 1:
+            continue
+        lats = [min(min_lat + i * height, max_lat) for i in range(rows)] + [max_lat]
+        lngs = [min(min_lng + j * width, max_lng) for j in range(cols)] + [max_lng]
+        return sorted({encode(a, b, precision) for a in lats for b in lngs})
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every geohash starting with prefix (None if unbounded)."""
+    chars = list(prefix)
+    while chars and chars[-1] == BASE32[-1]:
+        chars.pop()
+    if not chars:
+        return None
+    chars[-1] = BASE32[BASE32.index(chars[-1]) + 1]
+    return "".join(chars)
+
+
+def nearby(queryset, lat, lng, radius_km, *, lat_field, lng_field, geohash_field, limit=50):
+    """
+    Objects of queryset within radius_km of (lat, lng), nearest first, each annotated
+    with distance_km. The database does the prefilter (geohash ranges + bounding
+    boxes); only candidates inside a box are ranked here.
+    """
+    area = Q()
+    for min_lat, max_lat, min_lng, max_lng in bounding_boxes(lat, lng, radius_km):
+        cells = Q()
+        for prefix in covering_prefixes(min_lat, max_lat, min_lng, max_lng):
+            # A range rather than startswith/LIKE, so a plain B-tree index is used everywhere.
+            cell = Q(**{f"{geohash_field}__gte": prefix})
+            upper = _prefix_upper_bound(prefix)
+            if upper is not None:
+                cell &= Q(**{f"{geohash_field}__lt": upper})
+            cells |= cell
+        area |= cells & Q(**{
+            f"{lat_field}__range": (min_lat, max_lat),
+            f"{lng_field}__range": (min_lng, max_lng),
+        })
+    candidates = queryset.filter(area).order_by()
+
+    ranked = []
+    for obj in candidates.iterator(chunk_size=2000):
+        distance = haversine_km(lat, lng, getattr(obj, lat_field), getattr(obj, lng_field))
+        if distance <= radius_km:
+            obj.distance_km = distance
+            ranked.append(obj)
+    return heapq.nsmallest(limit, ranked, key=lambda obj: obj.distance_km)
@@ -0,0 +1,61 @@
+# core/images.py
+"""
+Compressed derivatives (thumbnail, medium) of uploaded images.
+
+Resizing and JPEG encoding are CPU-bound, so they run in a process pool rather
+than in the worker threads that call render(). This module only depends on
+Pillow at import time: the pool uses the "spawn" start method, and its
+children import nothing from Django.
+"""
+import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+# name -> (bounding box in pixels, JPEG quality)
+SIZES = {
+    "thumb": ((256, 256), 70),
+    "medium": ((1024, 1024), 80),
+}
+RENDER_TIMEOUT_SECONDS = 60
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def render_derivatives(data, names):
+    """JPEG bytes of each named size for the image in data. Runs in a pool process."""
+    largest = max((SIZES[name][0] for name in names), key=lambda box: box[0] * box[1])
+    with Image.open(io.BytesIO(data)) as source:
+        # Lets the JPEG decoder downscale by 1/2..1/8 while decoding a camera-sized original.
+        source.draft("RGB", largest)
+        image = ImageOps.exif_transpose(source).convert("RGB")
+    rendered = {}
+    for name in names:
+        box, quality = SIZES[name]
+        derivative = image.copy()
+        derivative.thumbnail(box, Image.LANCZOS)  # never upscales
+        out = io.BytesIO()
+        derivative.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+        rendered[name] = out.getvalue()
+    return rendered
+
+
+def pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from django.conf import settings
+
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, "IMAGE_PROCESS_WORKERS", None),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def render(data, names):
+    """render_derivatives() in the process pool; blocks the calling thread until done."""
+    return pool().submit(render_derivatives, data, list(names)).result(timeout=RENDER_TIMEOUT_SECONDS)
@@ -0,0 +1,176 @@
+# core/management/commands/bench_indexes.py
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import (
+    ChatRoom, Client, ClientDriverChat, CustomUser, Driver, JobBid, JobPost, Notification,
+)
+
+# Indexes added for the hot filter paths (see Meta.indexes in core/models.py).
+HOT_PATH_INDEXES = [
+    (JobPost, "jobpost_status_created_idx"),
+    (JobBid, "jobbid_post_status_idx"),
+    (ClientDriverChat, "chat_receiver_unread_idx"),
+    (Notification, "notification_user_unread_idx"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large dataset and report EXPLAIN plans and latency for the hot filter "
+        "paths with and without their indexes. Runs in a throwaway database created "
+        "like the test database (Postgres needs CREATEDB) and destroyed afterwards, "
+        "so the configured database is never written to or locked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50_000, help="Rows per seeded table.")
+        parser.add_argument("--users", type=int, default=200, help="Clients and drivers to spread rows over.")
+        parser.add_argument("--repeat", type=int, default=50, help="Timed runs per query.")
+
+    def handle(self, *args, **options):
+        random.seed(42)
+        # Points the connection at a freshly migrated database until destroy_test_db().
+        old_name = connection.settings_dict["NAME"]
+        self.stdout.write("creating a throwaway benchmark database...")
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with transaction.atomic():
+                params = self.seed(options["rows"], options["users"])
+                self.analyze()
+                after = self.run_queries(params, options["repeat"])
+                self.drop_indexes()
+                self.analyze()
+                before = self.run_queries(params, options["repeat"])
+                transaction.set_rollback(True)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(f"\nbackend: {connection.vendor}, rows per table: {options['rows']}\n")
+        for name in after:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, result in (("before", before[name]), ("after", after[name])):
+                self.stdout.write(f"  {label:<6} median {result['median_ms']:8.3f} ms   p95 {result['p95_ms']:8.3f} ms")
+                for line in result["plan"].splitlines():
+                    self.stdout.write(f"           {line}")
+
+    def seed(self, rows, users):
+        self.stdout.write(f"seeding {rows} rows per table...")
+        # bulk_create skips the post_save profile signal, so profiles are created here.
+        client_users = CustomUser.objects.bulk_create(
+            CustomUser(username=f"bench-client-{i}", email=f"bench-client-{i}@example.invalid", role="client")
+            for i in range(users)
+        )
+        driver_users = CustomUser.objects.bulk_create(
+            CustomUser(username=f"bench-driver-{i}", email=f"bench-driver-{i}@example.invalid", role="driver")
+            for i in range(users)
+        )
+        clients = Client.objects.bulk_create(Client(user=u) for u in client_users)
+        drivers = Driver.objects.bulk_create(
+            Driver(user=u, license_number=f"B{i}", personalID="ID/bench.jpg") for i, u in enumerate(driver_users)
+        )
+
+        statuses = [choice for choice, _ in JobPost.STATUS_CHOICES]
+        posts = JobPost.objects.bulk_create(
+            (
+                JobPost(
+                    client=random.choice(clients), pickup_location="A", dropoff_location="B",
+                    title=f"bench job {i}", description="bench",
+                    # ~10% of the board is open, the rest is history.
+                    status="pending" if random.random() < 0.1 else random.choice(statuses),
+                )
+                for i in range(rows)
+            ),
+            batch_size=1000,
+        )
+        JobBid.objects.bulk_create(
+            (
+                JobBid(
+                    job_post=posts[i % len(posts)], driver=drivers[(i // len(posts)) % len(drivers)],
+                    bid_message="bench", proposed_price=Decimal("100.00"),
+                    estimated_turnaround=timedelta(hours=4),
+                    status=random.choice(["pending", "accepted", "rejected"]),
+                )
+                for i in range(rows)
+            ),
+            batch_size=1000,
+        )
+        rooms = ChatRoom.objects.bulk_create(
+            ChatRoom(job_post=posts[i], client=posts[i].client, driver=drivers[i % len(drivers)])
+            for i in range(min(users * 5, len(posts)))
+        )
+        messages = []
+        for i in range(rows):
+            room = rooms[i % len(rooms)]
+            if i % 2:
+                sender, receiver = room.client_id, room.driver_id
+            else:
+                sender, receiver = room.driver_id, room.client_id
+            messages.append(ClientDriverChat(
+                chat_room=room, sender_id=sender, receiver_id=receiver,
+                message="bench", read_status=random.random() < 0.95,
+            ))
+        ClientDriverChat.objects.bulk_create(messages, batch_size=1000)
+        Notification.objects.bulk_create(
+            (
+                Notification(user=random.choice(client_users), message="bench", is_read=random.random() < 0.9)
+                for _ in range(rows)
+            ),
+            batch_size=1000,
+        )
+        return {
+            "user": client_users[0].pk,
+            "job_post": posts[len(posts) // 2].pk,
+        }
+
+    def hot_queries(self, params):
+        return {
+            "public job board (status=pending, -created_at)":
+                JobPost.objects.filter(status="pending").order_by("-created_at")[:20],
+            "bids for a job (job_post, status, -created_at)":
+                JobBid.objects.filter(job_post_id=params["job_post"], status="pending").order_by("-created_at")[:20],
+            "unread chat count (receiver WHERE NOT read_status)":
+                ClientDriverChat.objects.filter(receiver_id=params["user"], read_status=False),
+            "unread notifications (user, -created_at WHERE NOT is_read)":
+                Notification.objects.filter(user_id=params["user"], is_read=False).order_by("-created_at")[:20],
+        }
+
+    def run_queries(self, params, repeat):
+        results = {}
+        for name, queryset in self.hot_queries(params).items():
+            if name.startswith("unread chat count"):
+                run = queryset.count
+                plan = queryset.values("pk").explain()
+            else:
+                run = lambda qs=queryset: list(qs.all())  # noqa: E731
+                plan = queryset.explain()
+            run()  # warm-up
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = {
+                "plan": plan,
+                "median_ms": statistics.median(timings),
+                "p95_ms": timings[int(len(timings) * 0.95) - 1],
+            }
+        return results
+
+    def drop_indexes(self):
+        # Plain DROP INDEX is transactional on both SQLite and Postgres, unlike the
+        # SQLite schema editor, which refuses to run inside atomic().
+        with connection.cursor() as cursor:
+            for _, name in HOT_PATH_INDEXES:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
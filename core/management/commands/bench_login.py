@@ -0,0 +1,64 @@
+# core/management/commands/bench_login.py
+import time
+
+from django.contrib.auth import authenticate, get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from core.views import MyTokenObtainPairSerializer
+
+User = get_user_model()
+
+BENCH_USERNAME = "__bench_login__"
+BENCH_PASSWORD = "bench-login-Password-1"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure single-core logins/sec for the token login serializer, comparing the "
+        "old double-authenticate path with the current single-pass one. "
+        "Runs in a throwaway database created like the test database (Postgres needs "
+        "CREATEDB) and destroyed afterwards, so the configured database is never written to or locked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        attrs = {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}
+
+        def legacy_login():
+            # What MyTokenObtainPairSerializer.validate used to do: authenticate,
+            # then let TokenObtainPairSerializer.validate authenticate again.
+            authenticate(username=BENCH_USERNAME, password=BENCH_PASSWORD)
+            serializer = MyTokenObtainPairSerializer(data=attrs)
+            TokenObtainPairSerializer.validate(serializer, dict(attrs))
+
+        def single_pass_login():
+            serializer = MyTokenObtainPairSerializer(data=attrs)
+            serializer.is_valid(raise_exception=True)
+
+        # Points the connection at a freshly migrated database until destroy_test_db().
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            user = User(username=BENCH_USERNAME, email="bench-login@example.invalid")
+            user.set_password(BENCH_PASSWORD)
+            user.save()
+
+            results = {}
+            for label, login in (("before (double hash)", legacy_login), ("after (single pass)", single_pass_login)):
+                login()  # warm-up
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    login()
+                elapsed = time.perf_counter() - start
+                results[label] = iterations / elapsed
+                self.stdout.write(f"{label:<22} {results[label]:8.2f} logins/sec/core ({elapsed / iterations * 1000:.1f} ms each)")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        before, after = results.values()
+        self.stdout.write(self.style.SUCCESS(f"speed-up: {after / before:.2f}x"))
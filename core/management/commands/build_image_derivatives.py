@@ -0,0 +1,44 @@
+# core/management/commands/build_image_derivatives.py
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import Driver
+from core.tasks import generate_image_derivatives
+from core.uploads import store_derivatives
+
+
+class Command(BaseCommand):
+    help = (
+        "Create missing personalID thumbnail/medium derivatives. Queues a task per "
+        "driver, or renders them here with --now."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--now", action="store_true", help="Render in this process instead of queueing tasks.")
+        parser.add_argument("--threads", type=int, default=4,
+                            help="With --now: drivers handled at once (rendering itself uses the image process pool).")
+        parser.add_argument("--all", action="store_true", help="Rebuild existing derivatives too.")
+
+    def handle(self, *args, **options):
+        drivers = Driver.objects.exclude(personalID="")
+        if not options["all"]:
+            drivers = drivers.filter(personalID_thumb="")
+        pks = list(drivers.order_by("pk").values_list("pk", flat=True))
+
+        if not options["now"]:
+            for pk in pks:
+                generate_image_derivatives.delay(Driver._meta.label, pk, "personalID")
+            self.stdout.write(self.style.SUCCESS(f"Queued derivatives for {len(pks)} drivers."))
+            return
+
+        def build(pk):
+            try:
+                store_derivatives(Driver, pk, "personalID")
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+            list(executor.map(build, pks))
+        self.stdout.write(self.style.SUCCESS(f"Built derivatives for {len(pks)} drivers."))
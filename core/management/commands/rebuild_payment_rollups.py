@@ -0,0 +1,32 @@
+# core/management/commands/rebuild_payment_rollups.py
+from django.core.management.base import BaseCommand
+
+from core.models import Client, ClientDailySpend, Driver, DriverDailyEarnings
+from core.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute DriverDailyEarnings and ClientDailySpend from Payment, one batch of "
+        "drivers/clients per transaction, fixing any drift in the signal-maintained rollups."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        for owner_model, rollup in ((Driver, DriverDailyEarnings), (Client, ClientDailySpend)):
+            pks = owner_model.objects.order_by("pk").values_list("pk", flat=True)
+            last_pk = None
+            rebuilt = 0
+            while True:
+                batch = pks.filter(pk__gt=last_pk) if last_pk is not None else pks
+                batch = list(batch[:batch_size])
+                if not batch:
+                    break
+                rebuild(rollup, batch)
+                last_pk = batch[-1]
+                rebuilt += len(batch)
+            self.stdout.write(f"{rollup.__name__}: rebuilt for {rebuilt} {owner_model.__name__.lower()}s")
+        self.stdout.write(self.style.SUCCESS("Done."))
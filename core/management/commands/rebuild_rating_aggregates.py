@@ -0,0 +1,52 @@
+# core/management/commands/rebuild_rating_aggregates.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from core.models import Driver, Rating
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Driver.rating_count/rating_sum/rating_avg from the Rating table in "
+        "batches of drivers, fixing any drift in the signal-maintained aggregates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = None
+        checked = fixed = 0
+        while True:
+            with transaction.atomic():
+                drivers = Driver.objects.order_by("pk")
+                if last_pk is not None:
+                    drivers = drivers.filter(pk__gt=last_pk)
+                # Lock the batch so concurrent rating signals wait for the rewrite.
+                batch = list(
+                    drivers.select_for_update()
+                    .only("pk", "rating_count", "rating_sum", "rating_avg")[:batch_size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                totals = {
+                    row["driver_id"]: (row["count"], row["total"])
+                    for row in Rating.objects.order_by()
+                    .filter(driver_id__in=[d.pk for d in batch])
+                    .values("driver_id")
+                    .annotate(count=Count("pk"), total=Sum("rating"))
+                }
+                changed = []
+                for driver in batch:
+                    count, total = totals.get(driver.pk, (0, 0))
+                    avg = total / count if count else 0.0
+                    if (driver.rating_count, driver.rating_sum, driver.rating_avg) != (count, total, avg):
+                        driver.rating_count, driver.rating_sum, driver.rating_avg = count, total, avg
+                        changed.append(driver)
+                Driver.objects.bulk_update(changed, ["rating_count", "rating_sum", "rating_avg"])
+                checked += len(batch)
+                fixed += len(changed)
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} drivers, corrected {fixed}."))
@@ -0,0 +1,77 @@
+# core/management/commands/runworker.py
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core.tasks import DatabaseBackend
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background tasks from the database queue (TASKS_BACKEND = 'database'). "
+        "Start as many workers as needed; they coordinate through the BackgroundTask table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queue", action="append", dest="queues",
+                            help="Queue to consume; repeat for several. Defaults to all queues.")
+        parser.add_argument("--concurrency", type=int, default=1,
+                            help="Tasks run at once, each in its own thread (e.g. --queue uploads --concurrency 4).")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when no task is due.")
+        parser.add_argument("--burst", action="store_true", help="Exit once no task is due.")
+        parser.add_argument("--max-tasks", type=int, default=None, help="Exit after running this many tasks.")
+
+    def handle(self, *args, **options):
+        if getattr(settings, "TASKS_BACKEND", "immediate") != "database":
+            self.stderr.write(self.style.WARNING(
+                f"TASKS_BACKEND is {settings.TASKS_BACKEND!r}, so nothing new is queued for this "
+                "worker; set TASKS_BACKEND=database for the web processes too."
+            ))
+        self.options = options
+        self.backend = DatabaseBackend()
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.processed = 0
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        queues = options["queues"]
+        self.stdout.write(
+            f"Worker consuming {', '.join(queues) if queues else 'all queues'} "
+            f"with concurrency {options['concurrency']}"
+        )
+        threads = [
+            threading.Thread(target=self.work, name=f"runworker-{i}", daemon=True)
+            for i in range(max(1, options["concurrency"]))
+        ]
+        for thread in threads:
+            thread.start()
+        # Join with a timeout so the main thread keeps handling signals.
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(0.5)
+        self.stdout.write(f"Worker stopped after {self.processed} tasks")
+
+    def work(self):
+        options = self.options
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                if self.backend.run_next(options["queues"]):
+                    with self.lock:
+                        self.processed += 1
+                        if options["max_tasks"] is not None and self.processed >= options["max_tasks"]:
+                            self.stopping.set()
+                    continue
+                if options["burst"]:
+                    break
+                self.stopping.wait(options["sleep"])
+        finally:
+            connection.close()  # each thread has its own connection
+
+    def stop(self, signum, frame):
+        # Running tasks finish, then the threads exit.
+        self.stopping.set()
@@ -0,0 +1,250 @@
+# core/matching.py
+"""
+Driver-job matching engine.
+
+Available cars are kept in a columnar candidate matrix (one NumPy array per
+feature). A job is scored against every candidate in a handful of vectorized
+passes and the top-k are picked with argpartition, so ranking cost does not
+grow with Python-level work per car.
+
+Each process keeps its own matrix. Car and Rating signals patch the affected
+rows in the process that made the change and bump a shared generation counter
+in the cache; any other process that sees a newer generation reloads from the
+database on its next use. A full reload also happens after MAX_AGE_SECONDS,
+which picks up bid turnaround history.
+"""
+import re
+import threading
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Avg
+
+from .geo import EARTH_RADIUS_KM
+from .models import Car, Driver, JobBid
+
+WEIGHTS = {
+    "distance": 0.4,
+    "rating": 0.3,
+    "turnaround": 0.2,
+    "capacity": 0.1,
+}
+DISTANCE_SCALE_KM = 25.0  # distance score halves roughly every 17 km
+NEUTRAL_RATING = 3.0  # drivers without ratings
+NEUTRAL_TURNAROUND_HOURS = 24.0  # drivers without bid history
+MAX_AGE_SECONDS = 15 * 60
+GENERATION_KEY = "matching:generation"
+
+_CAPACITY_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def parse_capacity(value):
+    """Car.capacity is free text ("5", "3.5 tons"); take its first number."""
+    match = _CAPACITY_RE.search(value or "")
+    return float(match.group()) if match else np.nan
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Distance from one point to arrays of points (NaN where coordinates are missing)."""
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlmb = np.radians(lngs - lng)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class CandidateMatrix:
+    """Columnar snapshot of available cars and their drivers' history."""
+
+    def __init__(self, rows, ratings, turnarounds):
+        self.car_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.driver_ids = np.array([r[1] for r in rows], dtype=np.int64)
+        self.capacity = np.array([parse_capacity(r[2]) for r in rows], dtype=np.float64)
+        self.lat = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=np.float64)
+        self.lng = np.array([np.nan if r[4] is None else r[4] for r in rows], dtype=np.float64)
+        self.rating = np.array([ratings.get(r[1], NEUTRAL_RATING) for r in rows], dtype=np.float64)
+        self.turnaround_hours = np.array(
+            [turnarounds.get(r[1], NEUTRAL_TURNAROUND_HOURS) for r in rows], dtype=np.float64
+        )
+        # Cars that become unavailable are tombstoned instead of compacted.
+        self.active = np.ones(len(rows), dtype=bool)
+        self.row_of = {car_id: i for i, car_id in enumerate(self.car_ids.tolist())}
+
+    def appended(self, row, rating, turnaround_hours):
+        """
+        A new matrix with one more car. Readers holding this one keep columns of
+        equal length; update() and tombstoning only write in place.
+        """
+        matrix = object.__new__(CandidateMatrix)
+        matrix.car_ids = np.append(self.car_ids, row[0])
+        matrix.driver_ids = np.append(self.driver_ids, row[1])
+        matrix.capacity = np.append(self.capacity, parse_capacity(row[2]))
+        matrix.lat = np.append(self.lat, np.nan if row[3] is None else row[3])
+        matrix.lng = np.append(self.lng, np.nan if row[4] is None else row[4])
+        matrix.rating = np.append(self.rating, rating)
+        matrix.turnaround_hours = np.append(self.turnaround_hours, turnaround_hours)
+        matrix.active = np.append(self.active, True)
+        matrix.row_of = {**self.row_of, row[0]: len(self.car_ids)}
+        return matrix
+
+    def update(self, i, row):
+        self.capacity[i] = parse_capacity(row[2])
+        self.lat[i] = np.nan if row[3] is None else row[3]
+        self.lng[i] = np.nan if row[4] is None else row[4]
+        self.active[i] = True
+
+
+CANDIDATE_COLUMNS = ("pk", "driver_id", "capacity", "latitude", "longitude")
+
+
+def _driver_ratings(driver_ids=None):
+    queryset = Driver.objects.order_by().filter(rating_count__gt=0)
+    if driver_ids is not None:
+        queryset = queryset.filter(pk__in=driver_ids)
+    return dict(queryset.values_list("pk", "rating_avg"))
+
+
+def _driver_turnarounds(driver_ids=None):
+    queryset = JobBid.objects.order_by()
+    if driver_ids is not None:
+        queryset = queryset.filter(driver_id__in=driver_ids)
+    averages = queryset.values("driver_id").annotate(avg=Avg("estimated_turnaround")).values_list("driver_id", "avg")
+    return {driver_id: avg.total_seconds() / 3600 for driver_id, avg in averages if avg is not None}
+
+
+class MatchingEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._loaded_at = 0.0
+        self._generation = None
+
+    # --- loading -------------------------------------------------------------
+
+    def _shared_generation(self):
+        generation = cache.get(GENERATION_KEY)
+        if generation is None:
+            cache.add(GENERATION_KEY, time.time_ns(), None)
+            generation = cache.get(GENERATION_KEY)
+        return generation
+
+    def _bump_generation(self):
+        try:
+            return cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, time.time_ns(), None)
+            return None
+
+    def reload(self):
+        generation = self._shared_generation()
+        rows = list(Car.objects.filter(is_available=True).order_by().values_list(*CANDIDATE_COLUMNS))
+        matrix = CandidateMatrix(rows, _driver_ratings(), _driver_turnarounds())
+        with self._lock:
+            self._matrix = matrix
+            self._loaded_at = time.monotonic()
+            self._generation = generation
+
+    def matrix(self):
+        stale = (
+            self._matrix is None
+            or time.monotonic() - self._loaded_at > MAX_AGE_SECONDS
+            or self._shared_generation() != self._generation
+        )
+        if stale:
+            self.reload()
+        return self._matrix
+
+    def _mark_changed(self):
+        """Record a local incremental update against the shared generation."""
+        previous = self._generation
+        generation = self._bump_generation()
+        # If another process changed something since our last sync, the next use reloads.
+        if generation is not None and previous is not None and generation == previous + 1:
+            self._generation = generation
+
+    # --- incremental refresh (called from signals) ---------------------------
+
+    def car_changed(self, car_pk):
+        if self._matrix is None:
+            self._bump_generation()
+            return
+        row = Car.objects.filter(pk=car_pk, is_available=True).values_list(*CANDIDATE_COLUMNS).first()
+        with self._lock:
+            matrix = self._matrix
+            i = matrix.row_of.get(car_pk)
+            if row is None:
+                if i is not None:
+                    matrix.active[i] = False
+            elif i is not None:
+                matrix.update(i, row)
+            else:
+                driver_id = row[1]
+                rating = _driver_ratings([driver_id]).get(driver_id, NEUTRAL_RATING)
+                turnaround = _driver_turnarounds([driver_id]).get(driver_id, NEUTRAL_TURNAROUND_HOURS)
+                self._matrix = matrix.appended(row, rating, turnaround)
+            self._mark_changed()
+
+    def driver_rating_changed(self, driver_pk):
+        if self._matrix is None:
+            self._bump_generation()
+            return
+        rating = _driver_ratings([driver_pk]).get(driver_pk, NEUTRAL_RATING)
+        with self._lock:
+            matrix = self._matrix
+            matrix.rating[matrix.driver_ids == driver_pk] = rating
+            self._mark_changed()
+
+    # --- scoring ---------------------------------------------------------------
+
+    def top_k(self, job_post, k=10, required_capacity=None):
+        """
+        Best k available cars for job_post as dicts, highest score first.
+        Cars below required_capacity are excluded; cars with unknown capacity or
+        location score neutrally on that term.
+        """
+        m = self.matrix()
+        mask = m.active.copy()
+
+        if required_capacity is not None:
+            mask &= ~(m.capacity < required_capacity)  # NaN compares False: unknown stays eligible
+            capacity_score = np.where(np.isnan(m.capacity), 0.5, required_capacity / np.maximum(m.capacity, 1e-9))
+            capacity_score = np.clip(capacity_score, 0.0, 1.0)
+        else:
+            capacity_score = np.full(len(m.car_ids), 0.5)
+
+        if job_post.pickup_latitude is not None and job_post.pickup_longitude is not None:
+            distance = haversine_km(job_post.pickup_latitude, job_post.pickup_longitude, m.lat, m.lng)
+            distance_score = np.where(np.isnan(distance), 0.5, np.exp(-distance / DISTANCE_SCALE_KM))
+        else:
+            distance = np.full(len(m.car_ids), np.nan)
+            distance_score = np.full(len(m.car_ids), 0.5)
+
+        score = (
+            WEIGHTS["distance"] * distance_score
+            + WEIGHTS["rating"] * (m.rating / 5.0)
+            + WEIGHTS["turnaround"] / (1.0 + m.turnaround_hours / 24.0)
+            + WEIGHTS["capacity"] * capacity_score
+        )
+        score = np.where(mask, score, -np.inf)
+
+        k = min(k, int(mask.sum()))
+        if k <= 0:
+            return []
+        best = np.argpartition(-score, k - 1)[:k]
+        best = best[np.argsort(-score[best])]
+        return [
+            {
+                "car": int(m.car_ids[i]),
+                "driver": int(m.driver_ids[i]),
+                "score": round(float(score[i]), 4),
+                "distance_km": None if np.isnan(distance[i]) else round(float(distance[i]), 3),
+                "driver_rating": round(float(m.rating[i]), 2),
+                "avg_turnaround_hours": round(float(m.turnaround_hours[i]), 2),
+            }
+            for i in best
+        ]
+
+
+engine = MatchingEngine()
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_alter_customuser_email"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="clientdriverchat",
+            index=models.Index(
+                condition=models.Q(("read_status", False)),
+                fields=["receiver"],
+                name="chat_receiver_unread_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobbid",
+            index=models.Index(
+                fields=["job_post", "status", "-created_at"],
+                name="jobbid_post_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobpost",
+            index=models.Index(
+                fields=["status", "-created_at"], name="jobpost_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("is_read", False)),
+                fields=["user", "-created_at"],
+                name="notification_user_unread_idx",
+            ),
+        ),
+    ]
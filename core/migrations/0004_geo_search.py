@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="car",
+            name="geohash",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=12
+            ),
+        ),
+        migrations.AddField(
+            model_name="car",
+            name="latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="car",
+            name="longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="jobpost",
+            name="dropoff_latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="jobpost",
+            name="dropoff_longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="jobpost",
+            name="pickup_geohash",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=12
+            ),
+        ),
+        migrations.AddField(
+            model_name="jobpost",
+            name="pickup_latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="jobpost",
+            name="pickup_longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="car",
+            index=models.Index(
+                fields=["is_available", "geohash"], name="car_available_geohash_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="jobpost",
+            index=models.Index(
+                fields=["status", "pickup_geohash"], name="jobpost_status_geohash_idx"
+            ),
+        ),
+    ]
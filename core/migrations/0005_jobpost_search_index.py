@@ -0,0 +1,44 @@
+# Full-text index for JobPost title/description; see core/search.py.
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE core_jobpost_fts USING fts5(title, description, tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO core_jobpost_fts(rowid, title, description) SELECT id, title, description FROM core_jobpost",
+]
+SQLITE_REVERSE = [
+    "DROP TABLE IF EXISTS core_jobpost_fts",
+]
+POSTGRES_FORWARD = [
+    "ALTER TABLE core_jobpost ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+    ") STORED",
+    "CREATE INDEX core_jobpost_search_vector_idx ON core_jobpost USING GIN (search_vector)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS core_jobpost_search_vector_idx",
+    "ALTER TABLE core_jobpost DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_geo_search"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            run({"sqlite": SQLITE_REVERSE, "postgresql": POSTGRES_REVERSE}),
+        ),
+    ]
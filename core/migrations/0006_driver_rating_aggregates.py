@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:23
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Driver = apps.get_model("core", "Driver")
+    Rating = apps.get_model("core", "Rating")
+    totals = (
+        Rating.objects.order_by()
+        .values("driver_id")
+        .annotate(count=Count("pk"), total=Sum("rating"))
+    )
+    for row in totals:
+        Driver.objects.filter(pk=row["driver_id"]).update(
+            rating_count=row["count"],
+            rating_sum=row["total"],
+            rating_avg=row["total"] / row["count"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_jobpost_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="driver",
+            name="rating_avg",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="driver",
+            name="rating_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="driver",
+            name="rating_sum",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="driver",
+            index=models.Index(
+                fields=["-rating_avg", "-rating_count"], name="driver_rating_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
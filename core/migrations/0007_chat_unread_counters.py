@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_unread_counters(apps, schema_editor):
+    ClientDriverChat = apps.get_model("core", "ClientDriverChat")
+    ChatUnreadCounter = apps.get_model("core", "ChatUnreadCounter")
+    unread = (
+        ClientDriverChat.objects.filter(read_status=False)
+        .order_by()
+        .values("receiver_id", "chat_room_id")
+        .annotate(count=Count("pk"))
+    )
+    ChatUnreadCounter.objects.bulk_create(
+        (
+            ChatUnreadCounter(
+                user_id=row["receiver_id"],
+                chat_room_id=row["chat_room_id"],
+                count=row["count"],
+            )
+            for row in unread.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_driver_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChatUnreadCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "chat_room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="unread_counters",
+                        to="core.chatroom",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="unread_counters",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("user", "chat_room")},
+            },
+        ),
+        migrations.RunPython(backfill_unread_counters, migrations.RunPython.noop),
+    ]
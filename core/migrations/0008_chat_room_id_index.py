@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_chat_unread_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="clientdriverchat",
+            index=models.Index(fields=["chat_room", "id"], name="chat_room_id_idx"),
+        ),
+    ]
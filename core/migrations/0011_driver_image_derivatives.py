@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_pending_uploads"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="driver",
+            name="personalID_medium",
+            field=models.ImageField(
+                blank=True, editable=False, upload_to="ID/derivatives"
+            ),
+        ),
+        migrations.AddField(
+            model_name="driver",
+            name="personalID_thumb",
+            field=models.ImageField(
+                blank=True, editable=False, upload_to="ID/derivatives"
+            ),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_payment_rollups(apps, schema_editor):
+    Payment = apps.get_model("core", "Payment")
+    for model_name, owner, lookup in (
+        ("DriverDailyEarnings", "driver_id", "job_offer__accepted_bid__driver_id"),
+        ("ClientDailySpend", "client_id", "job_offer__job_post__client_id"),
+    ):
+        Rollup = apps.get_model("core", model_name)
+        totals = (
+            Payment.objects.order_by()
+            .values(owner=models.F(lookup), day=TruncDate("created_at"))
+            .annotate(amount=Sum("amount"), payments=Count("pk"))
+        )
+        Rollup.objects.bulk_create(
+            (
+                Rollup(
+                    **{owner: row["owner"]},
+                    day=row["day"],
+                    amount=row["amount"],
+                    payments=row["payments"],
+                )
+                for row in totals.iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_driver_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClientDailySpend",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("payments", models.IntegerField(default=0)),
+                (
+                    "client",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_spend",
+                        to="core.client",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("client", "day")},
+            },
+        ),
+        migrations.CreateModel(
+            name="DriverDailyEarnings",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("payments", models.IntegerField(default=0)),
+                (
+                    "driver",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_earnings",
+                        to="core.driver",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("driver", "day")},
+            },
+        ),
+        migrations.RunPython(backfill_payment_rollups, migrations.RunPython.noop),
+    ]
@@ -1,16 +1,37 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.contenttypes.models import ContentType
 import uuid
-from django.db.models import Q, F
+from django.db.models import Q, F, Case, When, Value, FloatField, Sum
+from django.db.models.functions import Cast, Greatest
+from django.db import IntegrityError, router
+from django.db.models.lookups import GreaterThan
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 from django.db import transaction
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 import datetime
+from .geo import geohash_or_blank
+from .cache import CHAT_PARTICIPANTS_CACHE_TTL, chat_participants_cache_key
 #from dateutil.relativedelta import relativedelta
 
+def _add_or_create(rows, create_kwargs, **updates):
+    """
+    Apply F() updates to rows, or create a row from create_kwargs if none matched
+    (no create when create_kwargs is None). Safe against a concurrent create.
+    """
+    if rows.update(**updates) or create_kwargs is None:
+        return
+    try:
+        with transaction.atomic():
+            rows.model.objects.create(**create_kwargs)
+    except IntegrityError:
+        # Lost the race to create it; the row exists now.
+        rows.update(**updates)
+
 # Base model for automatic timestamping.
 class Timer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -41,12 +62,45 @@ class Driver(Timer):
     license_number = models.CharField(max_length=100)
     frequent_location = models.CharField(max_length=100, blank=True, null=True)
     personalID = models.ImageField(upload_to="ID")
+    # Compressed copies of personalID, written by the generate_image_derivatives task.
+    personalID_thumb = models.ImageField(upload_to="ID/derivatives", blank=True, editable=False)
+    personalID_medium = models.ImageField(upload_to="ID/derivatives", blank=True, editable=False)
+    # Denormalized from Rating; maintained by apply_rating_delta() via signals and
+    # rebuilt by `manage.py rebuild_rating_aggregates`.
+    rating_count = models.IntegerField(default=0, editable=False)
+    rating_sum = models.IntegerField(default=0, editable=False)
+    rating_avg = models.FloatField(default=0, editable=False)
     
+    # image field -> {size in core.images.SIZES: field holding that derivative}
+    IMAGE_DERIVATIVES = {
+        'personalID': {'thumb': 'personalID_thumb', 'medium': 'personalID_medium'},
+    }
+
     def __str__(self):
         return self.user.username
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-rating_avg', '-rating_count'], name='driver_rating_idx'),
+        ]
+
+    @classmethod
+    def apply_rating_delta(cls, driver_id, count_delta, sum_delta):
+        """Shift a driver's rating aggregates in one atomic UPDATE."""
+        new_count = lambda: F('rating_count') + count_delta  # noqa: E731
+        new_sum = lambda: F('rating_sum') + sum_delta  # noqa: E731
+        cls.objects.filter(pk=driver_id).update(
+            rating_count=new_count(),
+            rating_sum=new_sum(),
+            # SET expressions see the pre-update columns, hence the deltas here too.
+            rating_avg=Case(
+                When(GreaterThan(new_count(), 0),
+                     then=Cast(new_sum(), FloatField()) / Cast(new_count(), FloatField())),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        )
 
 class Client(Timer):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True)
@@ -63,6 +117,9 @@ class Car(Timer):
     plate_no = models.CharField(max_length=100)
     capacity = models.CharField(max_length=100)
     frequent_location = models.CharField(max_length=200, blank=True, null=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, default="", editable=False)
     is_available = models.BooleanField(default=True)
     
     def __str__(self):
@@ -71,6 +128,19 @@ class Car(Timer):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['driver', 'plate_no']
+        indexes = [
+            models.Index(fields=['is_available', 'geohash'], name='car_available_geohash_idx'),
+        ]
+
+    def refresh_geohash(self):
+        self.geohash = geohash_or_blank(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        self.refresh_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
 
 class JobPost(Timer):
     STATUS_CHOICES = [
@@ -84,6 +154,11 @@ class JobPost(Timer):
     client = models.ForeignKey(Client, on_delete=models.CASCADE)
     pickup_location = models.CharField(max_length=100)
     dropoff_location = models.CharField(max_length=100)
+    pickup_latitude = models.FloatField(blank=True, null=True)
+    pickup_longitude = models.FloatField(blank=True, null=True)
+    pickup_geohash = models.CharField(max_length=12, blank=True, default="", editable=False)
+    dropoff_latitude = models.FloatField(blank=True, null=True)
+    dropoff_longitude = models.FloatField(blank=True, null=True)
     pickup_time = models.DateTimeField(auto_now_add=True)
     title = models.CharField(max_length=100)
     description = models.CharField(max_length=500)
@@ -95,6 +170,22 @@ class JobPost(Timer):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['client', 'title']
+        indexes = [
+            # Public job board: status="pending" newest first.
+            models.Index(fields=['status', '-created_at'], name='jobpost_status_created_idx'),
+            # Jobs near me: pending posts by pickup geohash range.
+            models.Index(fields=['status', 'pickup_geohash'], name='jobpost_status_geohash_idx'),
+        ]
+
+    def refresh_geohash(self):
+        self.pickup_geohash = geohash_or_blank(self.pickup_latitude, self.pickup_longitude)
+
+    def save(self, *args, **kwargs):
+        self.refresh_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'pickup_latitude', 'pickup_longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'pickup_geohash'}
+        super().save(*args, **kwargs)
 
 
 class JobBid(Timer):
@@ -116,6 +207,9 @@ class JobBid(Timer):
     class Meta:
         ordering = ['-created_at']
         unique_together = ('job_post', 'driver')
+        indexes = [
+            models.Index(fields=['job_post', 'status', '-created_at'], name='jobbid_post_status_idx'),
+        ]
 
 
 class JobOffer(Timer):
@@ -136,12 +230,75 @@ class Payment(Timer):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     
     def __str__(self):
-        return f"{self.job_offer.driver.user.username} - {self.job_offer.job_post.title}"
+        return f"{self.job_offer.accepted_bid.driver.user.username} - {self.job_offer.job_post.title}"
 
     class Meta:
         ordering = ['-created_at']
         unique_together = ['job_offer', 'amount']
 
+    def save(self, *args, **kwargs):
+        # Atomic so the daily rollups updated by post_save commit with the payment.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What the daily rollups currently include for this row, so an edit can be
+        # applied as a delta.
+        instance._rolled_up = (
+            instance.__dict__.get('job_offer_id'), instance.__dict__.get('amount'), instance.__dict__.get('created_at'),
+        )
+        return instance
+
+class DailyRollup(models.Model):
+    """
+    Payments summed per owner and day (UTC), so analytics read a few rows per
+    period instead of scanning Payment history. Kept current by the Payment
+    signals and rebuilt by `manage.py rebuild_payment_rollups`.
+    """
+    owner_field = None
+    day = models.DateField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payments = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def add(cls, owner_id, day, amount, payments):
+        """Shift one day's totals, creating the row on first use."""
+        owner = {f'{cls.owner_field}_id': owner_id, 'day': day}
+        # Nothing to subtract from means the rollup already missed this payment.
+        _add_or_create(
+            cls.objects.filter(**owner), {**owner, 'amount': amount, 'payments': payments} if payments >= 0 else None,
+            amount=F('amount') + amount, payments=F('payments') + payments,
+        )
+
+
+class DriverDailyEarnings(DailyRollup):
+    owner_field = 'driver'
+    driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='daily_earnings')
+
+    class Meta:
+        # The unique index doubles as the (driver, day) range-scan index.
+        unique_together = ('driver', 'day')
+
+    def __str__(self):
+        return f"{self.driver_id} earned {self.amount} on {self.day}"
+
+
+class ClientDailySpend(DailyRollup):
+    owner_field = 'client'
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='daily_spend')
+
+    class Meta:
+        unique_together = ('client', 'day')
+
+    def __str__(self):
+        return f"{self.client_id} spent {self.amount} on {self.day}"
+
+
 class Rating(Timer):
     job_offer = models.ForeignKey(JobOffer, on_delete=models.CASCADE)
     rating = models.IntegerField()
@@ -152,9 +309,30 @@ class Rating(Timer):
     def __str__(self):
         return f"Rating: {self.rating}"
 
+    def save(self, *args, **kwargs):
+        # Atomic so the driver aggregates updated by post_save commit with the rating.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What the driver aggregates currently include for this row, so an edit can
+        # be applied as a delta.
+        instance._aggregated = (instance.__dict__.get('driver_id'), instance.__dict__.get('rating'))
+        return instance
+
 
 class ChatRoom(Timer):
-    """Represents a chat room for a specific job, between a client and a driver."""
+    """
+    Represents a chat room for a specific job, between a client and a driver.
+    Client and Driver are keyed by their user, so client_id and driver_id are
+    also the participants' user ids.
+    """
     chat_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     job_post = models.ForeignKey(JobPost, on_delete=models.CASCADE, related_name="chat_rooms")
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="chat_rooms")
@@ -166,6 +344,53 @@ class ChatRoom(Timer):
     def __str__(self):
         return f"Chat Room for Job: {self.job_post.title} | {self.client.user.username} ↔ {self.driver.user.username}"
 
+    PARTICIPANT_FIELDS = ("id", "chat_id", "job_post_id", "client_id", "driver_id")
+
+    @classmethod
+    def from_participants(cls, chat_id):
+        """
+        The room with only its participant columns loaded, served from the cache
+        after the first lookup. None if it doesn't exist.
+        """
+        key = chat_participants_cache_key(chat_id)
+        values = cache.get(key)
+        if values is None:
+            values = cls.objects.filter(chat_id=chat_id).values_list(*cls.PARTICIPANT_FIELDS).first()
+            if values is None:
+                return None
+            cache.set(key, values, CHAT_PARTICIPANTS_CACHE_TTL)
+        return cls.from_db(router.db_for_read(cls), list(cls.PARTICIPANT_FIELDS), list(values))
+
+    def messages_after(self, after_id=0, limit=100):
+        """
+        Up to limit messages with id > after_id, oldest first, plus whether more
+        are waiting. Message ids grow monotonically, so the last id returned is
+        the cursor for the next call.
+        """
+        messages = list(self.messages.filter(pk__gt=after_id).order_by('pk')[:limit + 1])
+        return messages[:limit], len(messages) > limit
+
+    def other_participant_id(self, user_id):
+        """The user on the other side of the room from user_id."""
+        return self.driver_id if user_id == self.client_id else self.client_id
+
+    def mark_read_up_to(self, user_id, up_to_id=None, up_to=None):
+        """
+        Mark every unread message addressed to user_id in this room as read, up to a
+        message id and/or timestamp watermark, with a single UPDATE. Returns the
+        number of messages flipped.
+        """
+        messages = self.messages.filter(receiver_id=user_id, read_status=False)
+        if up_to_id is not None:
+            messages = messages.filter(pk__lte=up_to_id)
+        if up_to is not None:
+            messages = messages.filter(created_at__lte=up_to)
+        with transaction.atomic():
+            marked = messages.update(read_status=True)
+            if marked:
+                ChatUnreadCounter.adjust(user_id, self.pk, -marked)
+        return marked
+
 
 class ClientDriverChat(Timer):
     """Represents a chat message between the client and driver within a chat room."""
@@ -175,32 +400,83 @@ class ClientDriverChat(Timer):
     message = models.TextField()
     read_status = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # get_unread_messages_count(). Partial rather than (receiver, read_status):
+            # Django renders read_status=False as NOT read_status, which SQLite can't
+            # match against a boolean index column.
+            models.Index(fields=['receiver'], condition=Q(read_status=False), name='chat_receiver_unread_idx'),
+            # ChatRoom.messages_after(): range scan on id within one room.
+            models.Index(fields=['chat_room', 'id'], name='chat_room_id_idx'),
+        ]
+
     def clean(self):
         """Ensure the sender and receiver are either the client or the bidding driver."""
-        if self.sender not in [self.chat_room.client.user, self.chat_room.driver.user]:
+        # Ids only (see ChatRoom), so this needs no queries.
+        participants = (self.chat_room.client_id, self.chat_room.driver_id)
+        if self.sender_id not in participants:
             raise ValidationError("Sender must be either the job's client or the bidding driver.")
-        if self.receiver not in [self.chat_room.client.user, self.chat_room.driver.user]:
+        if self.receiver_id not in participants:
             raise ValidationError("Receiver must be either the job's client or the bidding driver.")
-        if self.sender == self.receiver:
+        if self.sender_id == self.receiver_id:
             raise ValidationError("Sender and receiver cannot be the same user.")
 
     def save(self, *args, **kwargs):
         self.clean()  # Run validation before saving
-        super().save(*args, **kwargs)
+        # Atomic so the unread counter updated by post_save commits with the message.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Read state the unread counters currently reflect for this row.
+        instance._counted_read_status = instance.__dict__.get('read_status')
+        return instance
 
     def mark_as_read(self):
         """Mark the chat message as read."""
+        if self.read_status:
+            return
+        with transaction.atomic():
+            # Conditional UPDATE, so concurrent calls decrement the counter only once.
+            flipped = ClientDriverChat.objects.filter(pk=self.pk, read_status=False).update(read_status=True)
+            if flipped:
+                ChatUnreadCounter.adjust(self.receiver_id, self.chat_room_id, -1)
         self.read_status = True
-        self.save(update_fields=["read_status"])
+        self._counted_read_status = True
 
     def get_unread_messages_count(self):
         """Get the count of unread messages for the receiver."""
-        return ClientDriverChat.objects.filter(receiver=self.receiver, read_status=False).count()
+        total = ChatUnreadCounter.objects.filter(user_id=self.receiver_id).aggregate(total=Sum('count'))['total']
+        return total or 0
 
     def __str__(self):
         return f"Message from {self.sender.username} to {self.receiver.username} in Chat {self.chat_room.chat_id}"
 
 
+class ChatUnreadCounter(models.Model):
+    """Unread messages per receiver and chat room, kept in step with ClientDriverChat."""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="unread_counters")
+    chat_room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name="unread_counters")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "chat_room")
+
+    def __str__(self):
+        return f"{self.count} unread for {self.user_id} in room {self.chat_room_id}"
+
+    @classmethod
+    def adjust(cls, user_id, chat_room_id, delta):
+        """Add delta (never going below zero) to a counter, creating it on first use."""
+        _add_or_create(
+            cls.objects.filter(user_id=user_id, chat_room_id=chat_room_id),
+            {'user_id': user_id, 'chat_room_id': chat_room_id, 'count': delta} if delta > 0 else None,
+            count=Greatest(F('count') + delta, Value(0)),
+        )
+
+
 class CarDoc(Timer):
     driver = models.ForeignKey(Driver, on_delete=models.CASCADE)
     car = models.ForeignKey(Car, on_delete=models.CASCADE)
@@ -243,6 +519,11 @@ class Notification(Timer):
     def __str__(self):
         return f"Notification for {self.user.username}: {self.message[:20]}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], condition=Q(is_read=False), name='notification_user_unread_idx'),
+        ]
+
 class Trip(Timer):
     job_offer = models.OneToOneField(JobOffer, on_delete=models.CASCADE)
     actual_pickup_time = models.DateTimeField(null=True, blank=True)
@@ -264,3 +545,62 @@ class DemoRequest(models.Model):
         return f"{self.full_name} <{self.email}> @ {self.created_at:%Y-%m-%d %H:%M}"
 
 
+class BackgroundTask(Timer):
+    """A queued call of a @task function (core/tasks.py), for the database task backend."""
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    name = models.CharField(max_length=200)
+    queue = models.CharField(max_length=50, default="default")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    # While running: when the claim expires and another worker may pick the task up.
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_after'], name='task_queue_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} [{self.status}, attempt {self.attempts}/{self.max_attempts}]"
+
+
+class PendingUpload(Timer):
+    """
+    A file accepted into local staging and waiting to be written to its model
+    field's storage by a background worker (core/uploads.py).
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="uploads")
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    field = models.CharField(max_length=100)
+    original_name = models.CharField(max_length=255)
+    staged_name = models.CharField(max_length=255)
+    stored_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='upload_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.original_name} -> {self.field} [{self.status}]"
@@ -0,0 +1,15 @@
+# core/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (-created_at, -pk), matching the Timer models' Meta.ordering.
+    Returns opaque next/previous cursors and never runs a COUNT(*), so deep pages
+    cost the same as the first one.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # pk rather than id: Driver and Client use the user as their primary key.
+    ordering = ('-created_at', '-pk')
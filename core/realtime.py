@@ -0,0 +1,73 @@
+# core/realtime.py
+"""
+Push side of real-time chat.
+
+New ClientDriverChat rows are published to a per-room group on the channel
+layer configured in settings.CHANNEL_LAYERS: the in-memory layer on a single
+node, or Redis (REDIS_URL) when several processes need to see each other's
+messages. ChatConsumer (core/consumers.py) relays group events to sockets.
+"""
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import StatelessJWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+
+def chat_group_name(chat_id):
+    return f"chat_{chat_id.hex}"
+
+
+def message_payload(message):
+    return {
+        "id": message.pk,
+        "chat_id": str(message.chat_room.chat_id),
+        "sender": message.sender_id,
+        "receiver": message.receiver_id,
+        "message": message.message,
+        "read_status": message.read_status,
+        "created_at": message.created_at.isoformat(),
+    }
+
+
+def publish_chat_message(message):
+    """Send a saved message to everyone subscribed to its room."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(
+        chat_group_name(message.chat_room.chat_id),
+        {"type": "chat.message", "message": message_payload(message)},
+    )
+
+
+class JWTAuthMiddleware:
+    """
+    Authenticate WebSocket connections with the same access tokens as the REST API,
+    passed as ?token=<access> since browsers can't set headers on a WebSocket.
+    scope["user"] is a claims-backed user, so no database lookup is needed.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.authentication = StatelessJWTAuthentication()
+
+    async def __call__(self, scope, receive, send):
+        params = parse_qs(scope.get("query_string", b"").decode())
+        raw_token = (params.get("token") or [None])[0]
+        scope["user"] = await self.get_user(raw_token) if raw_token else AnonymousUser()
+        return await self.inner(scope, receive, send)
+
+    @database_sync_to_async
+    def get_user(self, raw_token):
+        try:
+            return self.authentication.get_user(self.authentication.get_validated_token(raw_token))
+        except (InvalidToken, TokenError):
+            return AnonymousUser()
@@ -0,0 +1,176 @@
+# core/reports.py
+"""
+Fleet utilization reports.
+
+The trips of a reporting window are loaded once into columnar NumPy arrays
+(car, driver, start, end, distance), with times in seconds from the window
+start and clipped to it. Per-car and per-driver figures are then computed in a
+few vectorized passes over those arrays instead of one aggregation per car.
+
+A trip is busy from actual_pickup_time to actual_dropoff_time; a trip with no
+dropoff yet is busy until now. Overlapping trips of the same car (or driver)
+count once. Trips and distance count the trips dropped off within the window.
+
+Reports are cached per window and invalidated by Trip and Car signals through
+a version counter (see core/cache.py).
+"""
+import datetime
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import (
+    FLEET_REPORT_CACHE_TTL, FLEET_REPORT_OPEN_CACHE_TTL, fleet_report_cache_key, fleet_report_version,
+)
+from .models import Car, Trip
+
+SECONDS_PER_HOUR = 3600.0
+
+
+def window_bounds(start, end):
+    """Aware datetimes from midnight of start to midnight after end, in the current time zone."""
+    tz = timezone.get_current_timezone()
+    lower = datetime.datetime.combine(start, datetime.time.min, tzinfo=tz)
+    upper = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz)
+    return lower, upper
+
+
+class TripIntervals:
+    """Columnar snapshot of the trips that overlap a window."""
+
+    def __init__(self, rows, lower, upper, now):
+        origin = lower.timestamp()
+        self.length = upper.timestamp() - origin
+        car_ids, driver_ids, pickups, dropoffs, distances = zip(*rows) if rows else ((),) * 5
+        self.car_ids = np.array(car_ids, dtype=np.int64)
+        self.driver_ids = np.array(driver_ids, dtype=np.int64)
+        pickup = np.array([t.timestamp() for t in pickups], dtype=np.float64) - origin
+        dropoff = np.array([np.nan if t is None else t.timestamp() for t in dropoffs], dtype=np.float64) - origin
+        self.distance = np.array([0.0 if d is None else float(d) for d in distances], dtype=np.float64)
+        self.completed = dropoff < self.length  # False for NaN, i.e. trips still in progress
+        ongoing_until = np.maximum(np.clip(now.timestamp() - origin, 0.0, self.length), pickup)
+        self.start = np.clip(pickup, 0.0, self.length)
+        self.end = np.clip(np.where(np.isnan(dropoff), ongoing_until, dropoff), self.start, self.length)
+
+    @classmethod
+    def load(cls, lower, upper):
+        rows = list(
+            Trip.objects.order_by()
+            .filter(actual_pickup_time__lt=upper)
+            .filter(Q(actual_dropoff_time__gt=lower) | Q(actual_dropoff_time__isnull=True))
+            .values_list(
+                "job_offer__car_id", "job_offer__accepted_bid__driver_id",
+                "actual_pickup_time", "actual_dropoff_time", "distance_travelled",
+            )
+        )
+        return cls(rows, lower, upper, timezone.now())
+
+
+def interval_stats(groups, size, start, end, length):
+    """
+    Busy seconds, idle gap count, idle gap seconds and longest idle gap per group
+    (0..size-1) for intervals [start, end) within a window of the given length.
+    Gaps are only counted between two busy stretches of the same group.
+    """
+    order = np.lexsort((start, groups))
+    groups = groups[order]
+    # Shifting each group by more than the window length keeps the groups apart,
+    # so one running maximum over the whole array yields each group's reach.
+    offset = groups * (length + 1.0)
+    start = start[order] + offset
+    end = end[order] + offset
+    reach = np.maximum.accumulate(end)
+    before = np.empty_like(reach)
+    before[:1] = -np.inf
+    before[1:] = reach[:-1]
+    busy = np.bincount(groups, weights=np.clip(end - np.maximum(start, before), 0.0, None), minlength=size)
+    same_group = np.zeros(len(groups), dtype=bool)
+    same_group[1:] = groups[1:] == groups[:-1]
+    gap = np.where(same_group, np.clip(start - before, 0.0, None), 0.0)
+    gaps = np.bincount(groups, weights=gap > 0, minlength=size).astype(np.int64)
+    idle = np.bincount(groups, weights=gap, minlength=size)
+    longest = np.zeros(size, dtype=np.float64)
+    np.maximum.at(longest, groups, gap)
+    return busy, gaps, idle, longest
+
+
+def _utilization_rows(key, ids, trips, busy, gaps, idle, longest, length, **columns):
+    hours = lambda seconds: np.round(seconds / SECONDS_PER_HOUR, 2).tolist()
+    values = {
+        key: ids.tolist(),
+        **columns,
+        "trips": trips.tolist(),
+        "busy_hours": hours(busy),
+        "utilization": np.round(busy / length, 4).tolist(),
+        "idle_gaps": gaps.tolist(),
+        "idle_gap_hours": hours(idle),
+        "longest_idle_gap_hours": hours(longest),
+    }
+    return [dict(zip(values, row)) for row in zip(*values.values())]
+
+
+def build_report(lower, upper):
+    """Per-car and per-driver utilization for the window [lower, upper)."""
+    fleet = list(Car.objects.order_by("pk").values_list("pk", "driver_id", "plate_no", "model"))
+    trips = TripIntervals.load(lower, upper)
+    length = trips.length
+    fleet_car_ids = np.array([car[0] for car in fleet], dtype=np.int64)
+    fleet_owner_ids = np.array([car[1] for car in fleet], dtype=np.int64)
+
+    # Every car, plus any car a trip refers to that was added after the fleet was read.
+    car_ids, car_index = np.unique(np.concatenate([fleet_car_ids, trips.car_ids]), return_inverse=True)
+    trip_car = car_index[len(fleet):]
+    details = {car[0]: car[1:] for car in fleet}
+    car_details = [details.get(car_id, (None, None, None)) for car_id in car_ids.tolist()]
+    # Car owners, plus drivers who drove someone else's car.
+    driver_ids, driver_index = np.unique(np.concatenate([fleet_owner_ids, trips.driver_ids]), return_inverse=True)
+    trip_driver = driver_index[len(fleet):]
+
+    completed = trips.completed
+    distance = np.where(completed, trips.distance, 0.0)
+    cars = _utilization_rows(
+        "car", car_ids,
+        np.bincount(trip_car, weights=completed, minlength=len(car_ids)).astype(np.int64),
+        *interval_stats(trip_car, len(car_ids), trips.start, trips.end, length), length,
+        driver=[car[0] for car in car_details],
+        plate_no=[car[1] for car in car_details],
+        model=[car[2] for car in car_details],
+        distance=np.round(np.bincount(trip_car, weights=distance, minlength=len(car_ids)), 2).tolist(),
+    )
+    pairs = np.unique(trip_driver * len(car_ids) + trip_car)
+    drivers = _utilization_rows(
+        "driver", driver_ids,
+        np.bincount(trip_driver, weights=completed, minlength=len(driver_ids)).astype(np.int64),
+        *interval_stats(trip_driver, len(driver_ids), trips.start, trips.end, length), length,
+        cars_driven=np.bincount(pairs // max(len(car_ids), 1), minlength=len(driver_ids)).tolist(),
+        distance=np.round(np.bincount(trip_driver, weights=distance, minlength=len(driver_ids)), 2).tolist(),
+    )
+    return {"window_hours": round(length / SECONDS_PER_HOUR, 2), "cars": cars, "drivers": drivers}
+
+
+def fleet_utilization(start, end):
+    """build_report() for the dates start..end (inclusive), cached per window."""
+    lower, upper = window_bounds(start, end)
+    key = fleet_report_cache_key(fleet_report_version(), lower, upper)
+    report = cache.get(key)
+    if report is None:
+        report = build_report(lower, upper)
+        # Windows that are still open change as in-progress trips go on.
+        ttl = FLEET_REPORT_OPEN_CACHE_TTL if upper > timezone.now() else FLEET_REPORT_CACHE_TTL
+        cache.set(key, report, ttl)
+    return report
+
+
+def summarize(cars, window_hours):
+    """Totals over a list of car rows from build_report()."""
+    busy_hours = sum(car["busy_hours"] for car in cars)
+    capacity = len(cars) * window_hours
+    return {
+        "cars": len(cars),
+        "trips": sum(car["trips"] for car in cars),
+        "distance": round(sum(car["distance"] for car in cars), 2),
+        "busy_hours": round(busy_hours, 2),
+        "utilization": round(busy_hours / capacity, 4) if capacity else 0.0,
+    }
@@ -0,0 +1,92 @@
+# core/rollups.py
+"""
+Daily payment rollups (DriverDailyEarnings, ClientDailySpend) and the
+day/week/month series the analytics endpoint builds from them.
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import ClientDailySpend, DriverDailyEarnings, JobOffer, Payment
+
+# rollup model -> Payment lookup of its owner
+OWNER_LOOKUPS = {
+    DriverDailyEarnings: "job_offer__accepted_bid__driver_id",
+    ClientDailySpend: "job_offer__job_post__client_id",
+}
+BUCKETS = {
+    "day": (None, lambda d: d),  # rows are already daily
+    "week": (TruncWeek, lambda d: d - datetime.timedelta(days=d.weekday())),
+    "month": (TruncMonth, lambda d: d.replace(day=1)),
+}
+
+
+def apply_payment(job_offer_id, amount, created_at, sign=1):
+    """Add (sign=1) or remove (sign=-1) one payment from both rollups."""
+    owners = JobOffer.objects.filter(pk=job_offer_id).values_list("accepted_bid__driver_id", "job_post__client_id").first()
+    if owners is None:
+        return
+    driver_id, client_id = owners
+    day = timezone.localdate(created_at)
+    DriverDailyEarnings.add(driver_id, day, sign * amount, sign)
+    ClientDailySpend.add(client_id, day, sign * amount, sign)
+
+
+def rebuild(model, owner_ids):
+    """Recompute the rollup rows of the given owners from Payment."""
+    owner = f"{model.owner_field}_id"
+    with transaction.atomic():
+        model.objects.filter(**{f"{owner}__in": owner_ids}).delete()
+        totals = (
+            Payment.objects.order_by()
+            .filter(**{f"{OWNER_LOOKUPS[model]}__in": owner_ids})
+            .values(owner=F(OWNER_LOOKUPS[model]), day=TruncDate("created_at"))
+            .annotate(amount=Sum("amount"), payments=Count("pk"))
+        )
+        model.objects.bulk_create(
+            (model(**{owner: row["owner"]}, day=row["day"], amount=row["amount"], payments=row["payments"])
+             for row in totals.iterator()),
+            batch_size=1000,
+        )
+
+
+def rebuild_for_offer(job_offer_id):
+    owners = JobOffer.objects.filter(pk=job_offer_id).values_list("accepted_bid__driver_id", "job_post__client_id").first()
+    if owners is not None:
+        rebuild(DriverDailyEarnings, [owners[0]])
+        rebuild(ClientDailySpend, [owners[1]])
+
+
+def _next_period(period, bucket):
+    if bucket == "day":
+        return period + datetime.timedelta(days=1)
+    if bucket == "week":
+        return period + datetime.timedelta(weeks=1)
+    return (period.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def series(model, owner_id, bucket, start, end):
+    """Totals per period between start and end (inclusive), with empty periods as zero."""
+    trunc, period_of = BUCKETS[bucket]
+    rows = (
+        model.objects.filter(**{f"{model.owner_field}_id": owner_id}, day__range=(start, end))
+        .order_by()
+        .values(period=trunc("day") if trunc else F("day"))
+        .annotate(amount=Sum("amount"), payments=Sum("payments"))
+    )
+    found = {row["period"]: row for row in rows}
+    result = []
+    period = period_of(start)
+    while period <= end:
+        row = found.get(period)
+        result.append({
+            "period": period,
+            "amount": row["amount"] if row else Decimal("0.00"),
+            "payments": row["payments"] if row else 0,
+        })
+        period = _next_period(period, bucket)
+    return result
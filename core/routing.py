@@ -0,0 +1,8 @@
+# core/routing.py
+from django.urls import path
+
+from .consumers import ChatConsumer
+
+websocket_urlpatterns = [
+    path("ws/chatrooms/<uuid:chat_id>/", ChatConsumer.as_asgi()),
+]
@@ -0,0 +1,150 @@
+# core/search.py
+"""
+Full-text search over JobPost.title and JobPost.description.
+
+The index depends on the database backend:
+- SQLite: FTS5 virtual table core_jobpost_fts (rowid = JobPost.id), kept in
+  sync by the JobPost signals in core/signals.py.
+- Postgres: generated tsvector column core_jobpost.search_vector with a GIN
+  index, maintained by the database itself.
+- Anything else: icontains fallback without ranking.
+Both indexes are created by migration 0005_jobpost_search_index.
+"""
+import html
+import re
+
+from django.db import connection
+
+FTS_TABLE = "core_jobpost_fts"
+# The database marks matches with private-use characters; the snippet is then
+# HTML-escaped and only those markers become tags (see render_snippet).
+SNIPPET_OPEN = "\ue000"
+SNIPPET_CLOSE = "\ue001"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _scope_sql(queryset):
+    return queryset.order_by().values("pk").query.sql_with_params()
+
+
+def render_snippet(text):
+    """HTML-safe snippet: the job text escaped, matches wrapped in <mark>."""
+    return html.escape(text).replace(SNIPPET_OPEN, "<mark>").replace(SNIPPET_CLOSE, "</mark>")
+
+
+def _attach(queryset, hits):
+    """Fetch hits (pk, rank, snippet) from queryset, keeping the ranked order."""
+    jobs = queryset.in_bulk([pk for pk, _, _ in hits])
+    results = []
+    for pk, rank, snippet in hits:
+        job = jobs.get(pk)
+        if job is not None:
+            job.rank = rank
+            job.snippet = render_snippet(snippet)
+            results.append(job)
+    return results
+
+
+class SQLiteFTSBackend:
+    @staticmethod
+    def match_expression(query):
+        """Quote every term so user input can't inject FTS5 syntax; prefix-match the last one."""
+        tokens = _TOKEN_RE.findall(query)
+        if not tokens:
+            return None
+        terms = ['"%s"' % token for token in tokens]
+        terms[-1] += "*"
+        return " ".join(terms)
+
+    def search(self, queryset, query, limit):
+        match = self.match_expression(query)
+        if match is None:
+            return []
+        scope_sql, scope_params = _scope_sql(queryset)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, -bm25({FTS_TABLE}, 2.0, 1.0), "
+                f"snippet({FTS_TABLE}, -1, %s, %s, '…', 16) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid IN ({scope_sql}) "
+                f"ORDER BY bm25({FTS_TABLE}, 2.0, 1.0) LIMIT %s",
+                [SNIPPET_OPEN, SNIPPET_CLOSE, match, *scope_params, limit],
+            )
+            hits = cursor.fetchall()
+        return _attach(queryset, hits)
+
+    def index(self, jobs):
+        rows = [(job.pk, job.title, job.description) for job in jobs]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk, _, _ in rows])
+            cursor.executemany(f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (%s, %s, %s)", rows)
+
+    def remove(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+class PostgresSearchBackend:
+    config = "english"
+
+    def search(self, queryset, query, limit):
+        if not query.strip():
+            return []
+        scope_sql, scope_params = _scope_sql(queryset)
+        headline_options = f"StartSel={SNIPPET_OPEN}, StopSel={SNIPPET_CLOSE}, MaxWords=24, MinWords=8"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT j.id, ts_rank(j.search_vector, q), "
+                "ts_headline(%s, j.title || ' ' || j.description, q, %s) "
+                "FROM core_jobpost j, websearch_to_tsquery(%s, %s) q "
+                f"WHERE j.search_vector @@ q AND j.id IN ({scope_sql}) "
+                "ORDER BY 2 DESC LIMIT %s",
+                [self.config, headline_options, self.config, query, *scope_params, limit],
+            )
+            hits = cursor.fetchall()
+        return _attach(queryset, hits)
+
+    def index(self, jobs):
+        pass  # generated column
+
+    def remove(self, pk):
+        pass
+
+
+class FallbackSearchBackend:
+    def search(self, queryset, query, limit):
+        matches = queryset.filter(title__icontains=query) | queryset.filter(description__icontains=query)
+        results = list(matches[:limit])
+        for job in results:
+            job.rank = 0.0
+            job.snippet = render_snippet(job.title)
+        return results
+
+    def index(self, jobs):
+        pass
+
+    def remove(self, pk):
+        pass
+
+
+def get_backend():
+    if connection.vendor == "sqlite":
+        return SQLiteFTSBackend()
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    return FallbackSearchBackend()
+
+
+def search_jobposts(queryset, query, limit=50):
+    """Ranked JobPosts from queryset matching query, each with .rank and .snippet."""
+    return get_backend().search(queryset, query, limit)
+
+
+def index_jobposts(jobs):
+    get_backend().index(jobs)
+
+
+def remove_jobpost(pk):
+    get_backend().remove(pk)
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from datetime import date, timedelta
 from .models import *
 
 User = get_user_model()
@@ -46,17 +49,19 @@ class UserSignupSerializer(serializers.ModelSerializer):
         # Extract driver-specific fields if present
         driver_fields = ['license_number', 'frequent_location', 'personalID']
         driver_data = {field: validated_data.pop(field) for field in driver_fields if field in validated_data}
+        # personalID is staged by RegisterView and stored by a background worker.
+        driver_data.pop('personalID', None)
         password = validated_data.pop('password')
 
         # Create the user
         user = User(**validated_data)
         user.set_password(password)
-        user.save()
 
-        # Store driver data in a temporary attribute for the signal
+        # Store driver data in a temporary attribute for the signal, which runs during save()
         if user.role == 'driver':
             user._driver_data = driver_data
 
+        user.save()
         return user
 
 class UserSerializer(serializers.ModelSerializer):
@@ -73,7 +78,11 @@ class DriverSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Driver
-        fields = ['user', 'license_number', 'frequent_location', 'personalID', 'created_at', 'updated_at']
+        fields = [
+            'user', 'license_number', 'frequent_location', 'personalID', 'personalID_thumb', 'personalID_medium',
+            'rating_count', 'rating_avg', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['personalID_thumb', 'personalID_medium', 'rating_count', 'rating_avg']
 
 class ClientSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -90,18 +99,134 @@ class CarSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Car
-        fields = ['driver', 'model', 'plate_no', 'capacity', 'frequent_location', 'is_available', 'created_at', 'updated_at']
+        fields = [
+            'driver', 'model', 'plate_no', 'capacity', 'frequent_location', 'latitude', 'longitude',
+            'is_available', 'created_at', 'updated_at'
+        ]
+
+class CurrentProfileDefault:
+    """
+    Default for read-only profile fields: the requesting user's Driver or Client,
+    as attached to the request by core/authentication.py.
+    """
+    requires_context = True
+
+    def __init__(self, role):
+        self.role = role
+
+    def __call__(self, serializer_field):
+        return getattr(serializer_field.context["request"], self.role)
+
 
 class JobPostSerializer(serializers.ModelSerializer):
+    # Read-only with a default, so (client, title) uniqueness is still validated.
+    client = serializers.PrimaryKeyRelatedField(read_only=True, default=CurrentProfileDefault("client"))
     created_at = serializers.DateTimeField(read_only=True)
     updated_at = serializers.DateTimeField(read_only=True)
     
     class Meta:
         model = JobPost
         fields = [
-            'client', 'pickup_location', 'dropoff_location', 'pickup_time',
+            'client', 'pickup_location', 'dropoff_location', 'pickup_latitude', 'pickup_longitude',
+            'dropoff_latitude', 'dropoff_longitude', 'pickup_time',
             'title', 'description', 'status', 'created_at', 'updated_at'
         ]
+        extra_kwargs = {
+            'pickup_latitude': {'min_value': -90, 'max_value': 90},
+            'pickup_longitude': {'min_value': -180, 'max_value': 180},
+            'dropoff_latitude': {'min_value': -90, 'max_value': 90},
+            'dropoff_longitude': {'min_value': -180, 'max_value': 180},
+        }
+
+class BulkJobPostSerializer(JobPostSerializer):
+    """Bulk items: (client, title) uniqueness is checked for the whole batch at once."""
+
+    class Meta(JobPostSerializer.Meta):
+        validators = []
+
+class NearbyJobPostSerializer(JobPostSerializer):
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta(JobPostSerializer.Meta):
+        fields = ['id'] + JobPostSerializer.Meta.fields + ['distance_km']
+
+class JobPostSearchResultSerializer(JobPostSerializer):
+    rank = serializers.FloatField(read_only=True)
+    snippet = serializers.CharField(read_only=True)
+
+    class Meta(JobPostSerializer.Meta):
+        fields = ['id'] + JobPostSerializer.Meta.fields + ['rank', 'snippet']
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=50)
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    """Defaults to the last 30 days, 12 weeks or 12 months, ending today."""
+    MAX_PERIODS = 366
+    DEFAULT_SPAN = {"day": 30, "week": 12, "month": 12}
+
+    bucket = serializers.ChoiceField(choices=["day", "week", "month"], default="day")
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        end = data.get("end") or timezone.localdate()
+        span = self.DEFAULT_SPAN[data["bucket"]]
+        if data["bucket"] == "day":
+            start = end - timedelta(days=span - 1)
+        elif data["bucket"] == "week":
+            start = end - timedelta(weeks=span - 1)
+        else:
+            months = end.year * 12 + end.month - span
+            start = date(months // 12, months % 12 + 1, 1)
+        start = data.get("start") or start
+        if start > end:
+            raise serializers.ValidationError("start must not be after end.")
+        days_per_period = {"day": 1, "week": 7, "month": 28}[data["bucket"]]
+        if (end - start).days // days_per_period + 1 > self.MAX_PERIODS:
+            raise serializers.ValidationError(f"At most {self.MAX_PERIODS} periods per request; use a larger bucket.")
+        return {**data, "start": start, "end": end}
+
+
+class AnalyticsPeriodSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    payments = serializers.IntegerField()
+
+
+class FleetReportQuerySerializer(serializers.Serializer):
+    """Defaults to the last 7 days, ending today."""
+    MAX_DAYS = 366
+    DEFAULT_DAYS = 7
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        end = data.get("end") or timezone.localdate()
+        start = data.get("start") or end - timedelta(days=self.DEFAULT_DAYS - 1)
+        if start > end:
+            raise serializers.ValidationError("start must not be after end.")
+        if (end - start).days + 1 > self.MAX_DAYS:
+            raise serializers.ValidationError(f"At most {self.MAX_DAYS} days per report.")
+        return {"start": start, "end": end}
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    # "output" rather than "format", which DRF reserves for renderer selection.
+    output = serializers.ChoiceField(choices=["csv", "ndjson"], default="csv")
+
+
+class MatchQuerySerializer(serializers.Serializer):
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    capacity = serializers.FloatField(min_value=0, required=False)
+
+class NearbyQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(min_value=0.1, max_value=500, default=25)
+    limit = serializers.IntegerField(min_value=1, max_value=200, default=50)
 
 class JobOfferSerializer(serializers.ModelSerializer):
     created_at = serializers.DateTimeField(read_only=True)
@@ -129,26 +254,71 @@ class RatingSerializer(serializers.ModelSerializer):
 
 
 class ClientDriverChatSerializer(serializers.ModelSerializer):
-    chat_id = serializers.UUIDField(read_only=True)
+    chat_id = serializers.UUIDField(source="chat_room.chat_id", read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
+    # Used to locate the chat room on create; the message itself only stores chat_room.
+    job_post = serializers.PrimaryKeyRelatedField(queryset=JobPost.objects.all(), write_only=True)
+    driver = serializers.PrimaryKeyRelatedField(queryset=Driver.objects.all(), write_only=True)
+    client = serializers.PrimaryKeyRelatedField(queryset=Client.objects.all(), write_only=True, required=False)
 
     class Meta:
         model = ClientDriverChat
         fields = ["chat_id", "chat_room", "job_post", "driver", "client", "sender", "receiver", "message", "read_status", "created_at"]
-        read_only_fields = ["chat_id", "created_at", "sender", "receiver"]
+        read_only_fields = ["chat_id", "chat_room", "created_at", "sender", "receiver"]
 
     def validate(self, data):
         """Ensure sender is either the client or the driver of the job post."""
         user = self.context["request"].user
-        job_post = data["job_post"]
-        client = job_post.client
-        driver = data["driver"]
-
-        if user not in [client.user, driver.user]:
+        # Ids only (see ChatRoom), so this needs no queries.
+        if user.pk not in [data["job_post"].client_id, data["driver"].pk]:
             raise serializers.ValidationError("You can only chat if you are the job's client or a bidding driver.")
 
         return data
 
+    def create(self, validated_data):
+        # job_post/driver/client only identify the room; they are not message columns.
+        for field in ("job_post", "driver", "client"):
+            validated_data.pop(field, None)
+        return super().create(validated_data)
+
+
+class ChatRoomSerializer(serializers.ModelSerializer):
+    created_at = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = ChatRoom
+        fields = ["chat_id", "job_post", "client", "driver", "created_at"]
+        read_only_fields = ["chat_id", "client", "created_at"]  # client comes from the job post
+
+
+class ChatMessageSerializer(serializers.ModelSerializer):
+    """A message posted to a known room; everything but the text comes from the room and caller."""
+    chat_id = serializers.UUIDField(source="chat_room.chat_id", read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = ClientDriverChat
+        fields = ["id", "chat_id", "sender", "receiver", "message", "read_status", "created_at"]
+        read_only_fields = ["id", "sender", "receiver", "read_status"]
+
+
+class MessageSyncQuerySerializer(serializers.Serializer):
+    """?after=<message id>&limit=; timeout (seconds) only applies to the long-poll endpoint."""
+    after = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=200, default=100)
+    timeout = serializers.FloatField(min_value=0, max_value=60, default=25)
+
+
+class ReadWatermarkSerializer(serializers.Serializer):
+    """Read everything up to up_to_id and/or up_to; with neither, the whole room."""
+    up_to_id = serializers.IntegerField(min_value=1, required=False)
+    up_to = serializers.DateTimeField(required=False)
+
+
+class UnreadRoomSerializer(serializers.Serializer):
+    chat_id = serializers.UUIDField()
+    unread = serializers.IntegerField()
+
 
 class CarDocSerializer(serializers.ModelSerializer):
     created_at = serializers.DateTimeField(read_only=True)
@@ -157,10 +327,22 @@ class CarDocSerializer(serializers.ModelSerializer):
     class Meta:
         model = CarDoc
         fields = [
-            'driver', 'car', 'carinsurance', 'car_license', 
+            'id', 'driver', 'car', 'carinsurance', 'car_license', 
             'technical_control', 'yellow_card', 'current_mileage', 
             'fuel_consumption', 'created_at', 'updated_at'
         ]
+        read_only_fields = ['driver']  # set from the caller in CarDocViewSet.perform_create
+
+class PendingUploadSerializer(serializers.ModelSerializer):
+    model = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PendingUpload
+        fields = ['id', 'model', 'object_id', 'field', 'original_name', 'status', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+    def get_model(self, obj):
+        return ContentType.objects.get_for_id(obj.content_type_id).model
 
 class NotificationSerializer(serializers.ModelSerializer):
     created_at = serializers.DateTimeField(read_only=True)
@@ -181,6 +363,8 @@ class TripSerializer(serializers.ModelSerializer):
             'distance_travelled', 'is_delivered', 'created_at', 'updated_at'
         ]
 class JobBidSerializer(serializers.ModelSerializer):
+    # Read-only with a default, so (job_post, driver) uniqueness is still validated.
+    driver = serializers.PrimaryKeyRelatedField(read_only=True, default=CurrentProfileDefault("driver"))
     created_at = serializers.DateTimeField(read_only=True)
     updated_at = serializers.DateTimeField(read_only=True)
     
@@ -190,6 +374,18 @@ class JobBidSerializer(serializers.ModelSerializer):
             'job_post', 'driver', 'bid_message', 'proposed_price',
             'estimated_turnaround', 'status', 'created_at', 'updated_at'
         ]
+
+class BulkJobBidSerializer(serializers.ModelSerializer):
+    """
+    Bulk items. job_post is a bare id so items validate without a query each;
+    the posts are checked for the whole batch at once.
+    """
+    job_post = serializers.IntegerField(min_value=1, source="job_post_id")
+
+    class Meta:
+        model = JobBid
+        fields = ['job_post', 'bid_message', 'proposed_price', 'estimated_turnaround']
+        validators = []
 #demo
 class DemoRequestSerializer(serializers.ModelSerializer):
     class Meta:
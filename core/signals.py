@@ -1,32 +1,28 @@
 # core/signals.py
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import CustomUser, Driver, Client, DemoRequest
-from django.conf import settings
-from django.core.mail import send_mail
+from .models import (
+    CustomUser, Driver, Client, DemoRequest, JobPost, Car, Rating, ChatRoom, ClientDriverChat, ChatUnreadCounter,
+    Payment, Trip,
+)
+from django.core.cache import cache
+from .cache import (
+    bump_fleet_report_version, bump_public_jobposts_version, chat_participants_cache_key, user_info_cache_key,
+)
+from .matching import engine as matching_engine
+from .search import index_jobposts, remove_jobpost
+from .realtime import publish_chat_message
+from . import rollups, tasks
 
 # Existing signal for DemoRequest
 @receiver(post_save, sender=DemoRequest)
 def send_demo_request_email(sender, instance, created, **kwargs):
     if not created:
         return
-    subject = "📞 New Demo Request Received"
-    message = (
-        f"Name:    {instance.full_name}\n"
-        f"Email:   {instance.email}\n"
-        f"Company: {instance.company or '—'}\n"
-        f"Phone:   {instance.phone or '—'}\n\n"
-        f"Date/Time: {instance.datetime or '—'}\n\n"
-        f"Message:\n{instance.message or '—'}\n\n"
-        f"Requested at: {instance.created_at:%Y-%m-%d %H:%M}"
-    )
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        ["marvinavi24@gmail.com"],
-        fail_silently=False,
-    )
+    # SMTP runs in a background worker, not in the request.
+    tasks.send_demo_request_email.delay(instance.pk)
 
 # New signal for CustomUser
 @receiver(post_save, sender=CustomUser)
@@ -43,4 +39,135 @@ def create_user_profile(sender, instance, created, **kwargs):
             personalID=driver_data.get('personalID')
         )
     elif instance.role == 'client':
-        Client.objects.create(user=instance)
\ No newline at end of file
+        Client.objects.create(user=instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_info(sender, instance, created, **kwargs):
+    if not created:
+        cache.delete(user_info_cache_key(instance.pk))
+
+
+@receiver(post_save, sender=JobPost)
+def index_jobpost(sender, instance, **kwargs):
+    # Same transaction as the row itself, so the search index never lags a commit.
+    index_jobposts([instance])
+
+
+@receiver(post_delete, sender=JobPost)
+def unindex_jobpost(sender, instance, **kwargs):
+    remove_jobpost(instance.pk)
+
+
+@receiver(post_save, sender=JobPost)
+@receiver(post_delete, sender=JobPost)
+def invalidate_public_jobposts(sender, instance, **kwargs):
+    # After commit, so a concurrent reader can't cache pre-commit rows under the new version.
+    transaction.on_commit(bump_public_jobposts_version)
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+def refresh_matching_car(sender, instance, **kwargs):
+    transaction.on_commit(lambda: matching_engine.car_changed(instance.pk))
+
+
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+@receiver(post_save, sender=Trip)
+@receiver(post_delete, sender=Trip)
+def invalidate_fleet_reports(sender, instance, **kwargs):
+    transaction.on_commit(bump_fleet_report_version)
+
+
+@receiver(post_save, sender=Rating)
+def update_driver_rating_on_save(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_aggregated', (None, None))
+    current = (instance.driver_id, instance.rating)
+    if previous is None:
+        Driver.apply_rating_delta(instance.driver_id, 1, instance.rating)
+    elif None in previous:
+        # Instance wasn't loaded with both fields; recount this driver from scratch.
+        rebuild_driver_rating(instance.driver_id)
+    elif previous[0] != current[0]:
+        Driver.apply_rating_delta(previous[0], -1, -previous[1])
+        Driver.apply_rating_delta(current[0], 1, current[1])
+    elif previous[1] != current[1]:
+        Driver.apply_rating_delta(current[0], 0, current[1] - previous[1])
+    instance._aggregated = current
+
+
+@receiver(post_delete, sender=Rating)
+def update_driver_rating_on_delete(sender, instance, **kwargs):
+    driver_id, rating = getattr(instance, '_aggregated', (instance.driver_id, instance.rating))
+    Driver.apply_rating_delta(driver_id, -1, -rating)
+
+
+def rebuild_driver_rating(driver_id):
+    totals = Rating.objects.filter(driver_id=driver_id).aggregate(count=Count('pk'), total=Sum('rating'))
+    count, total = totals['count'], totals['total'] or 0
+    Driver.objects.filter(pk=driver_id).update(
+        rating_count=count, rating_sum=total, rating_avg=total / count if count else 0.0,
+    )
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def refresh_matching_rating(sender, instance, **kwargs):
+    transaction.on_commit(lambda: matching_engine.driver_rating_changed(instance.driver_id))
+
+
+@receiver(post_save, sender=ChatRoom)
+@receiver(post_delete, sender=ChatRoom)
+def invalidate_chat_participants(sender, instance, created=False, **kwargs):
+    if not created:
+        cache.delete(chat_participants_cache_key(instance.chat_id))
+
+
+@receiver(post_save, sender=ClientDriverChat)
+def update_unread_counter_on_save(sender, instance, created, **kwargs):
+    if created:
+        if not instance.read_status:
+            ChatUnreadCounter.adjust(instance.receiver_id, instance.chat_room_id, 1)
+    else:
+        # Only instances loaded from the database know what the counter reflects.
+        previous = getattr(instance, '_counted_read_status', None)
+        if previous is not None and previous != instance.read_status:
+            ChatUnreadCounter.adjust(instance.receiver_id, instance.chat_room_id, -1 if instance.read_status else 1)
+    instance._counted_read_status = instance.read_status
+
+
+@receiver(post_save, sender=ClientDriverChat)
+def push_chat_message(sender, instance, created, **kwargs):
+    if created:
+        # robust: a pub/sub outage must not fail the request that stored the message.
+        transaction.on_commit(lambda: publish_chat_message(instance), robust=True)
+
+
+@receiver(post_delete, sender=ClientDriverChat)
+def update_unread_counter_on_delete(sender, instance, **kwargs):
+    if not getattr(instance, '_counted_read_status', instance.read_status):
+        ChatUnreadCounter.adjust(instance.receiver_id, instance.chat_room_id, -1)
+
+
+@receiver(post_save, sender=Payment)
+def update_payment_rollups_on_save(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_rolled_up', (None, None, None))
+    current = (instance.job_offer_id, instance.amount, instance.created_at)
+    if previous is None:
+        rollups.apply_payment(*current)
+    elif None in previous:
+        # Instance wasn't loaded with the fields the rollups need; recount its owners.
+        rollups.rebuild_for_offer(instance.job_offer_id)
+    elif previous != current:
+        rollups.apply_payment(*previous, sign=-1)
+        rollups.apply_payment(*current)
+    instance._rolled_up = current
+
+
+@receiver(post_delete, sender=Payment)
+def update_payment_rollups_on_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_rolled_up', None)
+    if previous is None or None in previous:
+        previous = (instance.job_offer_id, instance.amount, instance.created_at)
+    rollups.apply_payment(*previous, sign=-1)
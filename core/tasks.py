@@ -1 +1,239 @@
-#future celery implementations
\ No newline at end of file
+# core/tasks.py
+"""
+Background tasks.
+
+Functions decorated with @task run outside the request/response cycle:
+
+    @task(max_attempts=5, backoff=60)
+    def send_demo_request_email(demo_request_id): ...
+
+    send_demo_request_email.delay(demo_request.pk)
+
+Where they run is chosen by settings.TASKS_BACKEND:
+- "immediate" (default): run in-process once the surrounding transaction
+  commits, without retries. For deployments with no worker process.
+- "database": BackgroundTask rows, executed by `manage.py runworker`.
+- "celery": published to the broker configured in config/celery.py, executed by
+  `celery -A config.celery worker`.
+The last two need their worker running; without it tasks queue up and never run.
+
+Delivery is at-least-once: a task whose worker dies, or that runs past its
+visibility_timeout, is picked up again. Tasks should be idempotent and take
+JSON-serializable arguments (primary keys, not model instances).
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import uploads
+from .models import BackgroundTask, DemoRequest
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 60 * 60
+
+registry = {}
+
+
+class Task:
+    def __init__(self, func, name, queue, max_attempts, backoff, visibility_timeout):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.visibility_timeout = visibility_timeout
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<Task {self.name}>"
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, countdown=0):
+        return get_backend().enqueue(self, list(args), kwargs or {}, countdown)
+
+    def retry_delay(self, attempts):
+        """Seconds to wait after the given number of failed attempts: exponential with jitter."""
+        delay = min(self.backoff * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+
+def task(func=None, *, name=None, queue="default", max_attempts=5, backoff=30, visibility_timeout=5 * 60):
+    """Register func as a background task. Usable bare (@task) or with options."""
+    def register(func):
+        registered = Task(
+            func, name or f"{func.__module__}.{func.__qualname__}", queue,
+            max_attempts, backoff, visibility_timeout,
+        )
+        registry[registered.name] = registered
+        return registered
+
+    return register(func) if func is not None else register
+
+
+# --- backends ------------------------------------------------------------------
+
+
+class ImmediateBackend:
+    def enqueue(self, task, args, kwargs, countdown):
+        # robust: a failing task is logged instead of failing a request that already committed.
+        transaction.on_commit(lambda: task(*args, **kwargs), robust=True)
+
+
+class DatabaseBackend:
+    """Queue in the BackgroundTask table; `manage.py runworker` drains it."""
+
+    claim_batch = 10
+
+    def enqueue(self, task, args, kwargs, countdown):
+        # Part of the caller's transaction: a rolled-back request never enqueues.
+        return BackgroundTask.objects.create(
+            name=task.name, queue=task.queue, args=args, kwargs=kwargs,
+            max_attempts=task.max_attempts,
+            run_after=timezone.now() + timedelta(seconds=countdown),
+        )
+
+    def claim(self, queues=None):
+        """
+        Lock the next due task from queues (all when None), or return None. Due
+        means queued and past run_after, or running with an expired claim (its
+        worker died or overran). The claim is a conditional UPDATE, so concurrent
+        workers never get the same row even where SELECT ... FOR UPDATE is
+        unavailable.
+        """
+        now = timezone.now()
+        candidates = BackgroundTask.objects.all()
+        if queues:
+            candidates = candidates.filter(queue__in=queues)
+        candidates = (
+            candidates.filter(Q(status="queued", run_after__lte=now) | Q(status="running", locked_until__lt=now))
+            .order_by("run_after")
+            .values_list("pk", "name", "status", "attempts", "max_attempts")[:self.claim_batch]
+        )
+        for pk, name, status, attempts, max_attempts in candidates:
+            current = BackgroundTask.objects.filter(pk=pk, status=status, attempts=attempts)
+            if attempts >= max_attempts:
+                # Lost its worker on the final attempt.
+                current.update(status="failed", locked_until=None, last_error="Visibility timeout expired.")
+                continue
+            task = registry.get(name)
+            timeout = task.visibility_timeout if task else 5 * 60
+            claimed = current.update(
+                status="running", attempts=F("attempts") + 1,
+                locked_until=now + timedelta(seconds=timeout),
+            )
+            if claimed:
+                return BackgroundTask.objects.get(pk=pk)
+        return None
+
+    def run(self, record):
+        """Execute a claimed task and record the outcome. Returns True on success."""
+        # Matching on attempts keeps a worker that overran its claim from
+        # overwriting the state of the run that replaced it.
+        current = BackgroundTask.objects.filter(pk=record.pk, status="running", attempts=record.attempts)
+        task = registry.get(record.name)
+        try:
+            if task is None:
+                raise LookupError(f"Unknown task {record.name!r}")
+            task(*record.args, **record.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            if task is None or record.attempts >= record.max_attempts:
+                if current.update(status="failed", locked_until=None, last_error=error):
+                    logger.error("Task %s (%s) failed permanently:\n%s", record.name, record.pk, error)
+            else:
+                delay = task.retry_delay(record.attempts)
+                if current.update(
+                    status="queued", locked_until=None, last_error=error,
+                    run_after=timezone.now() + timedelta(seconds=delay),
+                ):
+                    logger.warning("Task %s (%s) failed, retrying in %.0fs", record.name, record.pk, delay)
+            return False
+        current.update(status="done", locked_until=None)
+        return True
+
+    def run_next(self, queues=None):
+        """Claim and run one task. Returns False if nothing was due."""
+        record = self.claim(queues)
+        if record is None:
+            return False
+        self.run(record)
+        return True
+
+
+class CeleryBackend:
+    """Publish to Celery; retries and backoff are handled by config.celery.run_task."""
+
+    def enqueue(self, task, args, kwargs, countdown):
+        from config.celery import run_task
+
+        # After commit, so the worker sees the rows the task refers to. robust: a
+        # broker outage is logged instead of failing a request that already committed.
+        transaction.on_commit(
+            lambda: run_task.apply_async(
+                (task.name, args, kwargs), queue=task.queue, countdown=countdown,
+                time_limit=task.visibility_timeout,
+            ),
+            robust=True,
+        )
+
+
+BACKENDS = {
+    "database": DatabaseBackend,
+    "celery": CeleryBackend,
+    "immediate": ImmediateBackend,
+}
+
+
+def get_backend():
+    return BACKENDS[getattr(settings, "TASKS_BACKEND", "immediate")]()
+
+
+# --- tasks ---------------------------------------------------------------------
+
+
+@task(max_attempts=5, backoff=60)
+def send_demo_request_email(demo_request_id):
+    instance = DemoRequest.objects.filter(pk=demo_request_id).first()
+    if instance is None:
+        return  # deleted before the worker got to it
+    subject = "📞 New Demo Request Received"
+    message = (
+        f"Name:    {instance.full_name}\n"
+        f"Email:   {instance.email}\n"
+        f"Company: {instance.company or '—'}\n"
+        f"Phone:   {instance.phone or '—'}\n\n"
+        f"Date/Time: {instance.datetime or '—'}\n\n"
+        f"Message:\n{instance.message or '—'}\n\n"
+        f"Requested at: {instance.created_at:%Y-%m-%d %H:%M}"
+    )
+    send_mail(
+        subject,
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        ["marvinavi24@gmail.com"],
+        fail_silently=False,
+    )
+
+
+@task(queue="uploads", max_attempts=5, backoff=10, visibility_timeout=10 * 60)
+def transfer_upload(upload_id):
+    uploads.transfer(upload_id, max_attempts=transfer_upload.max_attempts)
+
+
+@task(queue="uploads", max_attempts=3, backoff=30)
+def generate_image_derivatives(model_label, pk, field):
+    uploads.store_derivatives(apps.get_model(model_label), pk, field)
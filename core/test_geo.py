@@ -0,0 +1,60 @@
+# core/test_geo.py
+import random
+
+from django.test import TestCase
+
+from . import geo
+from .models import Car, Driver
+from .test_query_budget import make_user
+
+
+def wrap_lng(lng):
+    return (lng + 180.0) % 360.0 - 180.0
+
+
+class NearbyTests(TestCase):
+    """nearby() against brute-force haversine where the bounding box wraps or degenerates."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = Driver.objects.get(pk=make_user("driver", "driver").pk)
+        rng = random.Random(8)
+        points = []
+        # Straddling the antimeridian.
+        points += [(rng.uniform(-2.0, 2.0), wrap_lng(180.0 + rng.uniform(-3.0, 3.0))) for _ in range(600)]
+        # Around both poles, at every longitude.
+        for pole in (90.0, -90.0):
+            points += [
+                (pole - pole / 90.0 * rng.uniform(0.0, 1.0), rng.uniform(-180.0, 180.0)) for _ in range(600)
+            ]
+        Car.objects.bulk_create(
+            Car(
+                driver=cls.driver, model="Van", plate_no=f"G-{i}", capacity="3",
+                latitude=lat, longitude=lng, geohash=geo.geohash_or_blank(lat, lng),
+            )
+            for i, (lat, lng) in enumerate(points)
+        )
+
+    def assert_matches_brute_force(self, lat, lng, radius_km):
+        expected = {
+            pk for pk, car_lat, car_lng in Car.objects.values_list("pk", "latitude", "longitude")
+            if geo.haversine_km(lat, lng, car_lat, car_lng) <= radius_km
+        }
+        found = geo.nearby(
+            Car.objects.all(), lat, lng, radius_km,
+            lat_field="latitude", lng_field="longitude", geohash_field="geohash", limit=len(expected) + 1,
+        )
+        self.assertTrue(expected)
+        self.assertEqual({car.pk for car in found}, expected)
+        distances = [car.distance_km for car in found]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_antimeridian(self):
+        for lng in (179.9, -179.9):
+            with self.subTest(lng=lng):
+                self.assert_matches_brute_force(0.5, lng, 150.0)
+
+    def test_poles(self):
+        for lat, lng in ((89.9, 10.0), (90.0, 0.0), (-89.9, -170.0), (-89.85, 179.9)):
+            with self.subTest(lat=lat, lng=lng):
+                self.assert_matches_brute_force(lat, lng, 30.0)
@@ -0,0 +1,75 @@
+# core/test_job_offers.py
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+
+from .models import Car, Client, Driver, JobBid, JobOffer, JobPost, Trip
+from .test_query_budget import make_user
+from .views import MyTokenObtainPairSerializer
+
+# Queries to accept a bid, whatever the number of bids on the post.
+ACCEPT_QUERIES = 14
+
+
+class AcceptBidTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = make_user("client", "client")
+        cls.token = str(MyTokenObtainPairSerializer.get_token(cls.client_user).access_token)
+        cls.drivers = [Driver.objects.get(pk=make_user(f"driver-{i}", "driver").pk) for i in range(50)]
+        cls.car_of = {
+            driver.pk: Car.objects.create(driver=driver, model="Van", plate_no=f"T-{i}", capacity="3").pk
+            for i, driver in enumerate(cls.drivers)
+        }
+
+    def post_with_bids(self, bids):
+        job_post = JobPost.objects.create(
+            client=Client.objects.get(pk=self.client_user.pk), pickup_location="A", dropoff_location="B",
+            title=f"Load with {bids} bids", description="Boxes",
+        )
+        JobBid.objects.bulk_create(
+            JobBid(
+                job_post=job_post, driver=driver, bid_message="Available", proposed_price=Decimal("100.00"),
+                estimated_turnaround=timedelta(hours=2),
+            )
+            for driver in self.drivers[:bids]
+        )
+        return job_post, list(JobBid.objects.filter(job_post=job_post).order_by("pk"))
+
+    def accept(self, job_post, bid):
+        return self.client.post(
+            "/api/joboffers/",
+            json.dumps({"job_post": job_post.pk, "accepted_bid": bid.pk, "car": self.car_of[bid.driver_id]}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.token}",
+        )
+
+    def test_accept_runs_a_fixed_number_of_queries(self):
+        for bids in (2, 50):
+            with self.subTest(bids=bids):
+                job_post, job_bids = self.post_with_bids(bids)
+                accepted = job_bids[-1]
+                with self.assertNumQueries(ACCEPT_QUERIES):
+                    response = self.accept(job_post, accepted)
+                self.assertEqual(response.status_code, 201, response.content)
+
+                job_post.refresh_from_db()
+                self.assertEqual(job_post.status, "job_offered")
+                statuses = dict(JobBid.objects.filter(job_post=job_post).values_list("pk", "status"))
+                self.assertEqual(statuses.pop(accepted.pk), "accepted")
+                self.assertEqual(set(statuses.values()), {"rejected"})
+                self.assertFalse(Car.objects.get(pk=self.car_of[accepted.driver_id]).is_available)
+                offer = JobOffer.objects.get(job_post=job_post)
+                self.assertTrue(Trip.objects.filter(job_offer=offer).exists())
+
+    def test_second_accept_for_the_same_post_is_refused(self):
+        job_post, (first, second) = self.post_with_bids(2)
+        self.assertEqual(self.accept(job_post, first).status_code, 201)
+
+        response = self.accept(job_post, second)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("job_post", response.json())
+        self.assertEqual(JobOffer.objects.filter(job_post=job_post).count(), 1)
+        self.assertTrue(Car.objects.get(pk=self.car_of[second.driver_id]).is_available)
@@ -0,0 +1,145 @@
+# core/test_query_budget.py
+"""
+Query budgets for the list endpoints. Each endpoint must run the same number of
+queries whether the caller can see 5 rows or 500, so an N+1 introduced by a
+serializer or a missing select_related fails here.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import TestCase
+
+from .models import (
+    Car, CarDoc, ChatRoom, Client, ClientDriverChat, CustomUser, Driver, JobBid, JobOffer, JobPost, Notification,
+    Payment, PendingUpload, Rating, Trip,
+)
+from .views import MyTokenObtainPairSerializer
+
+# (endpoint, role) -> queries per request, whatever the number of rows. A role
+# of None requests the endpoint anonymously.
+BUDGETS = {
+    ("public/jobposts", None): 1,
+    ("jobposts", "client"): 1,
+    ("jobposts", "driver"): 1,
+    ("cars", "client"): 1,
+    ("cars", "driver"): 1,
+    ("cardocs", "client"): 1,
+    ("cardocs", "driver"): 1,
+    ("uploads", "client"): 1,
+    ("uploads", "driver"): 1,
+    ("notifications", "client"): 2,
+    ("notifications", "driver"): 2,
+    ("drivers", "client"): 2,
+    ("drivers", "driver"): 2,
+    ("clients", "client"): 2,
+    ("clients", "driver"): 2,
+    ("jobbids", "client"): 1,
+    ("jobbids", "driver"): 1,
+    ("joboffers", "client"): 1,
+    ("joboffers", "driver"): 1,
+    ("payments", "client"): 1,
+    ("payments", "driver"): 1,
+    ("trips", "client"): 1,
+    ("trips", "driver"): 1,
+    ("ratings", "client"): 1,
+    ("ratings", "driver"): 1,
+    ("chats", "client"): 2,
+    ("chats", "driver"): 2,
+    ("chatrooms", "client"): 1,
+    ("chatrooms", "driver"): 1,
+}
+# Drivers and clients only see their own profile; the other role sees every one.
+OWN_PROFILE = {("drivers", "driver"), ("clients", "client")}
+# Rows visible on top of the seeded ones: the two callers' profiles and the car
+# created in setUpTestData.
+EXTRA_ROWS = {"drivers": 1, "clients": 1, "cars": 1}
+PAGE_SIZE = 20
+
+
+def make_user(username, role):
+    user = CustomUser(
+        username=username, email=f"{username}@example.com", role=role, password=make_password(None),
+    )
+    if role == "driver":
+        user._driver_data = {"license_number": f"L-{username}", "personalID": "ID/test.jpg"}
+    user.save()  # the post_save signal creates the Driver/Client profile
+    return user
+
+
+class ListQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = make_user("client", "client")
+        cls.driver_user = make_user("driver", "driver")
+        cls.car = Car.objects.create(
+            driver_id=cls.driver_user.pk, model="Van", plate_no="T-1", capacity="3",
+        )
+        cls.tokens = {
+            user.role: str(MyTokenObtainPairSerializer.get_token(user).access_token)
+            for user in (cls.client_user, cls.driver_user)
+        }
+        cls.seed(range(5))
+
+    @classmethod
+    def seed(cls, numbers):
+        """One row of every listed model per number, visible to both callers."""
+        client = Client.objects.get(pk=cls.client_user.pk)
+        driver = Driver.objects.get(pk=cls.driver_user.pk)
+        car_doc_type = ContentType.objects.get_for_model(CarDoc)
+        for i in numbers:
+            make_user(f"other-driver-{i}", "driver")
+            make_user(f"other-client-{i}", "client")
+            car = Car.objects.create(driver=driver, model="Van", plate_no=f"S-{i}", capacity="3")
+            doc = CarDoc.objects.create(
+                driver=driver, car=car, carinsurance="insurance/i.pdf", car_license="license/l.pdf",
+                technical_control="technical_control/t.pdf", yellow_card="yellow_card/y.pdf",
+                current_mileage=1000, fuel_consumption=8,
+            )
+            for user in (cls.client_user, cls.driver_user):
+                Notification.objects.create(user=user, message=f"Update {i}")
+                PendingUpload.objects.create(
+                    owner=user, content_type=car_doc_type, object_id=doc.pk, field="carinsurance",
+                    original_name="i.pdf", staged_name=f"staged/{i}.pdf",
+                )
+            job_post = JobPost.objects.create(
+                client=client, pickup_location="A", dropoff_location="B", title=f"Load {i}", description="Boxes",
+            )
+            bid = JobBid.objects.create(
+                job_post=job_post, driver=driver, bid_message="Available", proposed_price=Decimal("100.00"),
+                estimated_turnaround=timedelta(hours=2),
+            )
+            offer = JobOffer.objects.create(job_post=job_post, accepted_bid=bid, car=cls.car)
+            Payment.objects.create(job_offer=offer, amount=Decimal("100.00"))
+            Trip.objects.create(job_offer=offer)
+            Rating.objects.create(job_offer=offer, rating=5, driver=driver, client=client)
+            room = ChatRoom.objects.create(job_post=job_post, client=client, driver=driver)
+            ClientDriverChat.objects.create(
+                chat_room=room, sender=cls.client_user, receiver=cls.driver_user, message="Hello",
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_list(self, endpoint, role):
+        headers = {} if role is None else {"HTTP_AUTHORIZATION": f"Bearer {self.tokens[role]}"}
+        return self.client.get(f"/api/{endpoint}/", **headers)
+
+    def assert_budgets(self, seeded):
+        for (endpoint, role), budget in BUDGETS.items():
+            if (endpoint, role) in OWN_PROFILE:
+                visible = 1
+            else:
+                visible = min(seeded + EXTRA_ROWS.get(endpoint, 0), PAGE_SIZE)
+            with self.subTest(endpoint=endpoint, role=role, seeded=seeded):
+                with self.assertNumQueries(budget):
+                    response = self.get_list(endpoint, role)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["results"]), visible)
+
+    def test_budget_does_not_grow_with_rows(self):
+        self.assert_budgets(seeded=5)
+        self.seed(range(5, 500))
+        self.assert_budgets(seeded=500)
@@ -0,0 +1,45 @@
+# core/test_search.py
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from .models import JobPost
+from .search import FallbackSearchBackend
+from .test_query_budget import make_user
+from .views import MyTokenObtainPairSerializer
+
+MARKUP = '<img src=x onerror="alert(1)"> pallets <script>alert(2)</script>'
+
+
+class SnippetEscapingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = make_user("client", "client")
+        cls.token = str(MyTokenObtainPairSerializer.get_token(cls.client_user).access_token)
+
+    def setUp(self):
+        cache.clear()
+        response = self.client.post(
+            "/api/jobposts/",
+            json.dumps({"title": MARKUP, "description": MARKUP, "pickup_location": "A", "dropoff_location": "B"}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.token}",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def assert_escaped(self, snippet):
+        self.assertNotIn("<img", snippet)
+        self.assertNotIn("<script", snippet)
+        self.assertIn("&lt;img src=x onerror=&quot;alert(1)&quot;&gt;", snippet)
+
+    def test_public_search_snippet_is_escaped(self):
+        response = self.client.get("/api/public/jobposts/", {"q": "pallets"})
+        self.assertEqual(response.status_code, 200)
+        [result] = response.json()["results"]
+        self.assert_escaped(result["snippet"])
+        self.assertIn("<mark>pallets</mark>", result["snippet"])
+
+    def test_fallback_snippet_is_escaped(self):
+        [job] = FallbackSearchBackend().search(JobPost.objects.all(), "pallets", limit=10)
+        self.assert_escaped(job.snippet)
@@ -1,6 +1,7 @@
-from django.test import TestCase
+"""
+Sample request payloads for manual API testing. Tests live in the test_*.py
+modules next to this one.
 
-# Create your tests here.
 #signup
 {
   "username": "testuser",
@@ -83,4 +84,4 @@ fuel_consumption: 8
   "distance_travelled": "12.50",
   "is_delivered": true
 }
-
+"""
@@ -0,0 +1,113 @@
+# core/uploads.py
+"""
+Staged uploads.
+
+Requests only write incoming files to the local "staging" storage (see
+settings.STORAGES) and record a PendingUpload. The transfer_upload task in
+core/tasks.py then copies each file to the storage of the model field it
+belongs to, so slow storage backends never hold a web worker. Transfers run on
+the "uploads" queue; its worker concurrency bounds how many run at once.
+"""
+import os
+import uuid
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import transaction
+
+from . import images
+from .models import PendingUpload
+
+
+def staging_storage():
+    return storages["staging"]
+
+
+def stage(instance, field, uploaded_file, owner_id):
+    """Stage uploaded_file for instance.<field> and queue its transfer."""
+    from .tasks import transfer_upload  # core.tasks imports this module
+
+    original_name = os.path.basename(uploaded_file.name)
+    staged_name = staging_storage().save(f"{uuid.uuid4().hex}-{original_name}", uploaded_file)
+    upload = PendingUpload.objects.create(
+        owner_id=owner_id,
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=instance.pk,
+        field=field,
+        original_name=original_name,
+        staged_name=staged_name,
+    )
+    transfer_upload.delay(str(upload.pk))
+    return upload
+
+
+def transfer(upload_id, max_attempts):
+    """
+    Copy a staged file to its field's storage and point the field at it. Failures
+    are recorded on the upload and re-raised so the task backend retries them,
+    until max_attempts is reached and the upload is marked failed.
+    """
+    upload = PendingUpload.objects.filter(pk=upload_id, status="pending").first()
+    if upload is None:
+        return  # already transferred, failed or deleted
+    model = ContentType.objects.get_for_id(upload.content_type_id).model_class()
+    staging = staging_storage()
+    try:
+        instance = model.objects.filter(pk=upload.object_id).first()
+        if instance is None:
+            upload.status = "failed"
+            upload.error = "The document was deleted before its file was stored."
+            upload.save(update_fields=["status", "error", "updated_at"])
+            staging.delete(upload.staged_name)
+            return
+        field = instance._meta.get_field(upload.field)
+        with staging.open(upload.staged_name) as staged:
+            name = field.generate_filename(instance, upload.original_name)
+            stored_name = field.storage.save(name, File(staged, name=upload.original_name), max_length=field.max_length)
+        with transaction.atomic():
+            # A column UPDATE, so concurrent transfers for the same row don't overwrite each other.
+            model.objects.filter(pk=instance.pk).update(**{field.attname: stored_name})
+            upload.status = "done"
+            upload.stored_name = stored_name
+            upload.error = ""
+            upload.save(update_fields=["status", "stored_name", "error", "updated_at"])
+        if upload.field in getattr(model, "IMAGE_DERIVATIVES", {}):
+            from .tasks import generate_image_derivatives
+
+            generate_image_derivatives.delay(model._meta.label, instance.pk, upload.field)
+    except Exception as exc:
+        upload.attempts += 1
+        upload.error = f"{type(exc).__name__}: {exc}"
+        if upload.attempts >= max_attempts:
+            upload.status = "failed"  # the staged file is kept for inspection
+            upload.save(update_fields=["attempts", "error", "status", "updated_at"])
+            return
+        upload.save(update_fields=["attempts", "error", "updated_at"])
+        raise
+    staging.delete(upload.staged_name)
+
+
+def store_derivatives(model, pk, field):
+    """
+    Render the sizes declared in model.IMAGE_DERIVATIVES[field] from the stored
+    original and save them next to it.
+    """
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not getattr(instance, field):
+        return
+    source = getattr(instance, field)
+    targets = model.IMAGE_DERIVATIVES[field]
+    with source.open("rb") as original:
+        rendered = images.render(original.read(), targets)
+    stem = os.path.splitext(os.path.basename(source.name))[0]
+    values = {}
+    for size, target in targets.items():
+        target_field = instance._meta.get_field(target)
+        name = target_field.generate_filename(instance, f"{stem}_{size}.jpg")
+        values[target_field.attname] = target_field.storage.save(
+            name, ContentFile(rendered[size]), max_length=target_field.max_length
+        )
+    # Skipped if the original was replaced meanwhile; its own task will run.
+    model.objects.filter(pk=pk, **{field: source.name}).update(**values)
@@ -14,16 +14,21 @@ router.register(r'jobbids', JobBidViewSet, basename='jobbids')
 router.register(r'payments', PaymentViewSet, basename='payment')
 router.register(r'ratings', RatingViewSet, basename='rating')
 router.register(r'chats', ClientDriverChatViewSet, basename='clientdriverchat')
+router.register(r'chatrooms', ChatRoomViewSet, basename='chatroom')
 router.register(r'cardocs', CarDocViewSet, basename='cardoc')
+router.register(r'uploads', PendingUploadViewSet, basename='upload')
 router.register(r'notifications', NotificationViewSet, basename='notification')
 router.register(r'trips', TripViewSet, basename='trip')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('chatrooms/<uuid:chat_id>/messages/poll/', ChatMessagePollView.as_view(), name='chatroom-messages-poll'),
     path('auth/register/', RegisterView.as_view(), name='auth-register'),
     path('auth/token/login/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/user/', UserInfoView.as_view(), name='user-info'),
     path('public/jobposts/', PublicJobPostListView.as_view(), name='public-jobposts'),
+    path('analytics/payments/', PaymentAnalyticsView.as_view(), name='payment-analytics'),
+    path('reports/fleet-utilization/', FleetUtilizationReportView.as_view(), name='fleet-utilization-report'),
     path('book-demo/', DemoRequestCreateAPIView.as_view(), name='book-demo'),
 ]
\ No newline at end of file
@@ -1,21 +1,45 @@
 # core/views.py
 from datetime import date, timedelta
-from rest_framework import viewsets, permissions, status
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from django.core.exceptions import PermissionDenied, ValidationError
-from django.db.models import Q
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.http import parse_etags
+from django.views import View
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth.models import update_last_login
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.generics import ListAPIView, CreateAPIView
+from rest_framework.parsers import JSONParser
 from .serializers import *
+from . import exports, geo, reports, rollups, search, uploads
+from .matching import engine as matching_engine
+from .parsers import NDJSONParser
+from .realtime import chat_group_name
 from .models import *
+from .authentication import PROFILE_CLAIMS, ProfileJWTAuthentication, StatelessJWTAuthentication
+from .cache import (
+    USER_INFO_CACHE_TTL, bump_public_jobposts_version, public_jobposts_cache_ttl, public_jobposts_page_key,
+    public_jobposts_version, user_info_cache_key,
+)
+import asyncio
+import hashlib
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -29,12 +53,13 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     password = serializers.CharField(required=True, write_only=True)
 
     def validate(self, attrs):
-        logger.debug(f"Received payload: {attrs}")
         username = attrs.get('username')
         password = attrs.get('password')
+        logger.debug(f"Login attempt for username: {username}")
 
-        # Authenticate user
-        user = authenticate(username=username, password=password)
+        # Authenticate once. Tokens are minted from this user below instead of via
+        # super().validate(), which would run the password hasher a second time.
+        user = authenticate(request=self.context.get('request'), username=username, password=password)
         if not user:
             logger.error(f"Authentication failed for username: {username}")
             raise serializers.ValidationError({'non_field_errors': ['Unable to log in with provided credentials.']})
@@ -44,11 +69,13 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
             raise serializers.ValidationError({'username': ['This user account is inactive.']})
 
         # Generate tokens
-        data = super().validate(attrs)
+        refresh = self.get_token(user)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
         return {
             "tokens": {
-                "refresh": data["refresh"],
-                "access": data["access"],
+                "refresh": str(refresh),
+                "access": str(refresh.access_token),
             },
             "user": {
                 "id": user.id,
@@ -61,6 +88,14 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     def get_token(cls, user):
         token = super().get_token(user)
         token["user_id"] = user.id
+        token["username"] = user.username
+        token["role"] = user.role
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+        # Embed the profile id so ProfileJWTAuthentication can skip the lookup.
+        if user.role in PROFILE_CLAIMS and hasattr(user, user.role):
+            claim, _ = PROFILE_CLAIMS[user.role]
+            token[claim] = user.pk
         return token
 
 class MyTokenObtainPairView(TokenObtainPairView):
@@ -70,188 +105,552 @@ class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 class UserInfoView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        serializer = UserSerializer(request.user)
-        return Response(serializer.data)
+        # Called on every page load: serve from a short-lived cache, cleared by the
+        # CustomUser post_save signal.
+        key = user_info_cache_key(request.user.pk)
+        data = cache.get(key)
+        if data is None:
+            user = get_object_or_404(User, pk=request.user.pk)
+            data = dict(UserSerializer(user).data)
+            cache.set(key, data, USER_INFO_CACHE_TTL)
+        return Response(data)
+
+class ExportMixin:
+    """
+    GET .../export/?output=csv|ndjson streams get_queryset() (same role scoping
+    as the list) with the columns in export_columns: (header, lookup) pairs.
+    """
+    export_columns = ()
+    export_name = "export"
+
+    @action(detail=False, methods=["GET"], pagination_class=None)
+    def export(self, request):
+        params = ExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return exports.stream_export(
+            request, self.get_queryset(), self.export_columns, params.validated_data["output"], self.export_name
+        )
+
+class BulkCreateMixin:
+    """
+    POST .../bulk/ with a JSON array or an NDJSON body creates many objects at
+    once. Items are validated one by one with bulk_serializer_class, checked
+    against existing rows by bulk_conflicts() in one query, and inserted with
+    bulk_create in batches. The response has one result per item, in order, and
+    is 201 when every item was created, 207 when some were and 400 when none were.
+    """
+    bulk_serializer_class = None
+    bulk_max_items = 1000
+    bulk_batch_size = 200
+
+    def bulk_owner(self):
+        """Model field values every item gets from the caller; raise to refuse."""
+        return {}
+
+    def bulk_conflicts(self, owner, valid):
+        """{index: errors} for validated items ({index: data}) that would violate a constraint."""
+        return {}
+
+    def bulk_instance(self, owner, data):
+        return self.bulk_serializer_class.Meta.model(**data, **owner)
+
+    def bulk_created(self, objs):
+        """Runs in the insert's transaction, in place of the post_save signals bulk_create skips."""
+
+    @action(detail=False, methods=["POST"], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        owner = self.bulk_owner()
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise serializers.ValidationError({'non_field_errors': ["Expected a non-empty array of items."]})
+        if len(items) > self.bulk_max_items:
+            raise serializers.ValidationError(
+                {'non_field_errors': [f"At most {self.bulk_max_items} items per request."]}
+            )
+        serializer = self.bulk_serializer_class(context=self.get_serializer_context())
+        results = [None] * len(items)
+        valid = {}
+        for index, item in enumerate(items):
+            try:
+                valid[index] = serializer.run_validation(item)
+            except serializers.ValidationError as exc:
+                results[index] = {'index': index, 'status': 400, 'errors': exc.detail}
+        for index, errors in self.bulk_conflicts(owner, valid).items():
+            del valid[index]
+            results[index] = {'index': index, 'status': 400, 'errors': errors}
+        objs = [self.bulk_instance(owner, data) for data in valid.values()]
+        try:
+            with transaction.atomic():
+                self.bulk_serializer_class.Meta.model.objects.bulk_create(objs, batch_size=self.bulk_batch_size)
+                self.bulk_created(objs)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {'non_field_errors': ["Some items conflict with rows created meanwhile; nothing was saved."]}
+            )
+        for index, obj in zip(valid, objs):
+            results[index] = {'index': index, 'status': 201, 'id': obj.pk}
+        if len(objs) == len(items):
+            code = status.HTTP_201_CREATED
+        elif objs:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response({'created': len(objs), 'failed': len(items) - len(objs), 'results': results}, status=code)
+
+class StagedUploadMixin:
+    """
+    Keeps the file fields in staged_file_fields out of the request: save_staged()
+    saves the object without them, stages each file locally and queues its
+    transfer (core/uploads.py). Create/update then answer 202 with the status of
+    each upload, pollable at /api/uploads/{id}/.
+    """
+    staged_file_fields = ()
+
+    def save_staged(self, serializer, **kwargs):
+        files = {
+            field: serializer.validated_data.pop(field)
+            for field in self.staged_file_fields
+            if serializer.validated_data.get(field)
+        }
+        instance = serializer.save(**kwargs)
+        self.staged_uploads = [
+            uploads.stage(instance, field, uploaded, self.request.user.pk) for field, uploaded in files.items()
+        ]
+        return instance
+
+    def create(self, request, *args, **kwargs):
+        return self.with_upload_status(super().create(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        return self.with_upload_status(super().update(request, *args, **kwargs))
+
+    def with_upload_status(self, response):
+        staged = getattr(self, "staged_uploads", None)
+        if staged:
+            response.data["uploads"] = PendingUploadSerializer(staged, many=True).data
+            response.status_code = status.HTTP_202_ACCEPTED
+        return response
 
-class DriverViewSet(viewsets.ModelViewSet):
+class DriverViewSet(StagedUploadMixin, viewsets.ModelViewSet):
     serializer_class = DriverSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ProfileJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    # Staged like signup, so thumbnail/medium derivatives follow every new personalID.
+    staged_file_fields = ("personalID",)
 
     def get_queryset(self):
+        queryset = Driver.objects.select_related('user')
         if self.request.user.role == 'driver':
-            return Driver.objects.filter(user=self.request.user)
-        return Driver.objects.all()
+            return queryset.filter(user=self.request.user)
+        return queryset
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        self.save_staged(serializer, user=self.request.user)
+
+    def perform_update(self, serializer):
+        self.save_staged(serializer)
 
 class ClientViewSet(viewsets.ModelViewSet):
     serializer_class = ClientSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ProfileJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
+        queryset = Client.objects.select_related('user')
         if self.request.user.role == 'client':
-            return Client.objects.filter(user=self.request.user)
-        return Client.objects.all()
+            return queryset.filter(user=self.request.user)
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 class CarViewSet(viewsets.ModelViewSet):
     serializer_class = CarSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         if self.request.user.role == 'driver':
-            driver = Driver.objects.get(user=self.request.user)
+            driver = self.request.driver
             return Car.objects.filter(driver=driver)
         return Car.objects.all()
 
     def perform_create(self, serializer):
         if self.request.user.role != 'driver':
             raise PermissionDenied("Only drivers can add cars")
-        driver = Driver.objects.get(user=self.request.user)
+        driver = self.request.driver
         serializer.save(driver=driver)
 
-class JobPostViewSet(viewsets.ModelViewSet):
+class JobPostSearchMixin:
+    """
+    ?q= full-text search for job post lists. Ranked matches (with a highlighted
+    snippet) replace the cursor page when a query is given.
+    """
+
+    def search_results(self, request):
+        if not request.query_params.get("q", "").strip():
+            return None
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        jobs = search.search_jobposts(
+            self.filter_queryset(self.get_queryset()), params.validated_data["q"], limit=params.validated_data["limit"],
+        )
+        return {"results": JobPostSearchResultSerializer(jobs, many=True).data}
+
+class JobPostViewSet(JobPostSearchMixin, BulkCreateMixin, viewsets.ModelViewSet):
     serializer_class = JobPostSerializer
-    authentication_classes = [JWTAuthentication]
+    bulk_serializer_class = BulkJobPostSerializer
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         if self.request.user.role == 'client':
-            client = Client.objects.get(user=self.request.user)
+            client = self.request.client
             return JobPost.objects.filter(client=client)
         return JobPost.objects.all()
 
+    def list(self, request, *args, **kwargs):
+        data = self.search_results(request)
+        if data is None:
+            return super().list(request, *args, **kwargs)
+        return Response(data)
+
     def perform_create(self, serializer):
         if self.request.user.role != 'client':
             raise PermissionDenied("Only clients can create job posts")
-        client = Client.objects.get(user=self.request.user)
+        client = self.request.client
         serializer.save(client=client)
 
-class JobBidViewSet(viewsets.ModelViewSet):
+    def bulk_owner(self):
+        if self.request.user.role != 'client':
+            raise PermissionDenied("Only clients can create job posts")
+        return {'client': self.request.client}
+
+    def bulk_conflicts(self, owner, valid):
+        titles = {data['title'] for data in valid.values()}
+        taken = set(
+            JobPost.objects.filter(client=owner['client'], title__in=titles).values_list('title', flat=True)
+        )
+        conflicts = {}
+        for index, data in valid.items():
+            if data['title'] in taken:
+                conflicts[index] = {'title': ["You already have a job post with this title."]}
+            taken.add(data['title'])  # later duplicates within the batch
+        return conflicts
+
+    def bulk_instance(self, owner, data):
+        job_post = super().bulk_instance(owner, data)
+        job_post.refresh_geohash()  # bulk_create skips save()
+        return job_post
+
+    def bulk_created(self, objs):
+        search.index_jobposts(objs)
+        transaction.on_commit(bump_public_jobposts_version)
+
+    @action(detail=False, methods=["GET"])
+    def nearby(self, request):
+        """
+        GET /api/jobposts/nearby/?lat=..&lng=..&radius_km=25&limit=50
+        Pending jobs whose pickup lies within radius_km, nearest first.
+        """
+        params = NearbyQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        jobs = geo.nearby(
+            JobPost.objects.filter(status="pending"),
+            params.validated_data["lat"], params.validated_data["lng"], params.validated_data["radius_km"],
+            lat_field="pickup_latitude", lng_field="pickup_longitude", geohash_field="pickup_geohash",
+            limit=params.validated_data["limit"],
+        )
+        return Response(NearbyJobPostSerializer(jobs, many=True).data)
+
+    @action(detail=True, methods=["GET"])
+    def matches(self, request, pk=None):
+        """
+        GET /api/jobposts/{id}/matches/?k=10&capacity=..
+        Top-k available cars for this job from the matching engine.
+        """
+        job_post = self.get_object()
+        params = MatchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(matching_engine.top_k(
+            job_post, k=params.validated_data["k"], required_capacity=params.validated_data.get("capacity"),
+        ))
+
+class JobBidViewSet(ExportMixin, BulkCreateMixin, viewsets.ModelViewSet):
     serializer_class = JobBidSerializer
-    authentication_classes = [JWTAuthentication]
+    bulk_serializer_class = BulkJobBidSerializer
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    export_name = "bids"
+    export_columns = (
+        ("id", "pk"),
+        ("created_at", "created_at"),
+        ("job_post", "job_post_id"),
+        ("job_title", "job_post__title"),
+        ("client", "job_post__client_id"),
+        ("driver", "driver_id"),
+        ("status", "status"),
+        ("proposed_price", "proposed_price"),
+        ("estimated_turnaround", "estimated_turnaround"),
+        ("bid_message", "bid_message"),
+    )
 
     def get_queryset(self):
         if self.request.user.role == 'driver':
-            driver = Driver.objects.get(user=self.request.user)
+            driver = self.request.driver
             return JobBid.objects.filter(driver=driver)
         elif self.request.user.role == 'client':
-            client = Client.objects.get(user=self.request.user)
+            client = self.request.client
             return JobBid.objects.filter(job_post__client=client)
         return JobBid.objects.all()
 
     def perform_create(self, serializer):
         if self.request.user.role != 'driver':
             raise PermissionDenied("Only drivers can create bids")
-        driver = Driver.objects.get(user=self.request.user)
+        driver = self.request.driver
         serializer.save(driver=driver)
 
+    def bulk_owner(self):
+        if self.request.user.role != 'driver':
+            raise PermissionDenied("Only drivers can create bids")
+        return {'driver': self.request.driver}
+
+    def bulk_conflicts(self, owner, valid):
+        post_ids = {data['job_post_id'] for data in valid.values()}
+        already_bid = JobBid.objects.filter(job_post=OuterRef('pk'), driver=owner['driver'])
+        posts = {
+            pk: (post_status, has_bid)
+            for pk, post_status, has_bid in JobPost.objects.filter(pk__in=post_ids)
+            .annotate(has_bid=Exists(already_bid))
+            .values_list('pk', 'status', 'has_bid')
+        }
+        conflicts = {}
+        for index, data in valid.items():
+            post_id = data['job_post_id']
+            if post_id not in posts:
+                conflicts[index] = {'job_post': [f'Invalid pk "{post_id}" - object does not exist.']}
+            elif posts[post_id][0] != 'pending':
+                conflicts[index] = {'job_post': ["This job post is no longer open for bids."]}
+            elif posts[post_id][1]:
+                conflicts[index] = {'job_post': ["You have already bid on this job post."]}
+            else:
+                posts[post_id] = ('pending', True)  # later duplicates within the batch
+        return conflicts
+
 class JobOfferViewSet(viewsets.ModelViewSet):
     serializer_class = JobOfferSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         if self.request.user.role == 'client':
-            client = Client.objects.get(user=self.request.user)
+            client = self.request.client
             return JobOffer.objects.filter(job_post__client=client)
         elif self.request.user.role == 'driver':
-            driver = Driver.objects.get(user=self.request.user)
+            driver = self.request.driver
             return JobOffer.objects.filter(accepted_bid__driver=driver)
         return JobOffer.objects.all()
 
     def perform_create(self, serializer):
+        """
+        Accept a bid. The job post row is locked for the whole operation, so of
+        two concurrent accepts for the same post only the first succeeds. Runs a
+        fixed number of queries however many bids the post has.
+        """
         if self.request.user.role != 'client':
             raise PermissionDenied("Only clients can create job offers")
-        client = Client.objects.get(user=self.request.user)
-        job_post = serializer.validated_data.get('job_post')
-        if job_post.client != client:
+        job_post = serializer.validated_data['job_post']
+        accepted_bid = serializer.validated_data['accepted_bid']
+        car = serializer.validated_data['car']
+        if job_post.client_id != self.request.client.pk:
             raise PermissionDenied("You can only create offers for your own job posts")
-        accepted_bid = serializer.validated_data.get('accepted_bid')
-        if accepted_bid.job_post != job_post:
+        if accepted_bid.job_post_id != job_post.pk:
             raise PermissionDenied("The accepted bid does not belong to the job post")
-        job_post.status = "job_offered"
-        job_post.save()
-        serializer.save()
-
-class PublicJobPostListView(ListAPIView):
+        if car.driver_id != accepted_bid.driver_id:
+            raise serializers.ValidationError({'car': ["The car must belong to the driver of the accepted bid."]})
+        with transaction.atomic():
+            # Re-read under the lock: the serializer's copy may predate a concurrent accept.
+            locked = JobPost.objects.select_for_update().filter(pk=job_post.pk).order_by()
+            if locked.values_list('status', flat=True).first() != 'pending':
+                raise serializers.ValidationError({'job_post': ["This job post is no longer open for bids."]})
+            if not Car.objects.filter(pk=car.pk, is_available=True).update(is_available=False):
+                raise serializers.ValidationError({'car': ["This car is not available."]})
+            JobBid.objects.filter(job_post=job_post).update(
+                status=Case(When(pk=accepted_bid.pk, then=Value('accepted')), default=Value('rejected')),
+            )
+            # Column UPDATEs skip the JobPost and Car signals: the search index only
+            # holds title and description, so just the board cache and the
+            # matching engine need to hear about it.
+            locked.update(status='job_offered', updated_at=timezone.now())
+            offer = serializer.save()
+            Trip.objects.create(job_offer=offer)
+            transaction.on_commit(bump_public_jobposts_version)
+            transaction.on_commit(lambda: matching_engine.car_changed(car.pk))
+
+class PublicJobPostListView(JobPostSearchMixin, ListAPIView):
     queryset = JobPost.objects.filter(status="pending")
     serializer_class = JobPostSerializer
     permission_classes = [AllowAny]
 
-class PaymentViewSet(viewsets.ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        # Pages are cached under the board version, which JobPost signals bump, so
+        # the ETag can be checked before touching the database. The variant covers
+        # scheme and host because pages embed absolute next/previous links.
+        version = public_jobposts_version()
+        variant = hashlib.md5(
+            f"{request.accepted_renderer.format}:{request.build_absolute_uri()}".encode()
+        ).hexdigest()
+        etag = f'"{version}-{variant}"'
+        headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        key = public_jobposts_page_key(version, variant)
+        data = cache.get(key)
+        if data is None:
+            data = self.search_results(request)
+            if data is None:
+                data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, public_jobposts_cache_ttl())
+        return Response(data, headers=headers)
+
+class PaymentViewSet(ExportMixin, viewsets.ModelViewSet):
     serializer_class = PaymentSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    export_name = "payments"
+    export_columns = (
+        ("id", "pk"),
+        ("created_at", "created_at"),
+        ("amount", "amount"),
+        ("job_offer", "job_offer_id"),
+        ("job_post", "job_offer__job_post_id"),
+        ("job_title", "job_offer__job_post__title"),
+        ("client", "job_offer__job_post__client_id"),
+        ("driver", "job_offer__accepted_bid__driver_id"),
+    )
 
     def get_queryset(self):
         if self.request.user.role == 'driver':
-            driver = Driver.objects.get(user=self.request.user)
-            return Payment.objects.filter(job_offer__driver=driver)
+            driver = self.request.driver
+            return Payment.objects.filter(job_offer__accepted_bid__driver=driver)
         elif self.request.user.role == 'client':
-            client = Client.objects.get(user=self.request.user)
+            client = self.request.client
             return Payment.objects.filter(job_offer__job_post__client=client)
         return Payment.objects.all()
 
 class RatingViewSet(viewsets.ModelViewSet):
     serializer_class = RatingSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         if self.request.user.role == 'driver':
-            driver = Driver.objects.get(user=self.request.user)
+            driver = self.request.driver
             return Rating.objects.filter(driver=driver)
         elif self.request.user.role == 'client':
-            client = Client.objects.get(user=self.request.user)
+            client = self.request.client
             return Rating.objects.filter(client=client)
         return Rating.objects.all()
 
     def perform_create(self, serializer):
         if self.request.user.role != 'client':
             raise PermissionDenied("Only clients can give ratings")
-        client = Client.objects.get(user=self.request.user)
+        client = self.request.client
         serializer.save(client=client)
 
+class PaymentAnalyticsView(APIView):
+    """
+    GET /api/analytics/payments/?bucket=day|week|month&start=&end=
+    Drivers get their earnings and clients their spend, per period, summed from
+    the daily rollup tables rather than from Payment.
+    """
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        role = request.user.role
+        if role == 'driver':
+            model, metric = DriverDailyEarnings, 'earnings'
+        elif role == 'client':
+            model, metric = ClientDailySpend, 'spend'
+        else:
+            raise PermissionDenied("Only drivers and clients have payment analytics")
+        params = AnalyticsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        bucket, start, end = (params.validated_data[k] for k in ('bucket', 'start', 'end'))
+        periods = rollups.series(model, request.user.pk, bucket, start, end)
+        return Response({
+            'metric': metric,
+            'bucket': bucket,
+            'start': start,
+            'end': end,
+            'total': '%.2f' % sum(period['amount'] for period in periods),
+            'payments': sum(period['payments'] for period in periods),
+            'periods': AnalyticsPeriodSerializer(periods, many=True).data,
+        })
+
+class FleetUtilizationReportView(APIView):
+    """
+    GET /api/reports/fleet-utilization/?start=&end=
+    Per-car and per-driver utilization, idle gaps and distance for the dates
+    start..end. Drivers get the cars they own; staff get the whole fleet.
+    """
+    authentication_classes = [ProfileJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        if not user.is_staff and user.role != 'driver':
+            raise PermissionDenied("Only drivers and staff have fleet reports")
+        params = FleetReportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        start, end = params.validated_data['start'], params.validated_data['end']
+        report = reports.fleet_utilization(start, end)
+        cars, drivers = report['cars'], report['drivers']
+        if not user.is_staff:
+            cars = [car for car in cars if car['driver'] == user.pk]
+            drivers = [driver for driver in drivers if driver['driver'] == user.pk]
+        return Response({
+            'start': start,
+            'end': end,
+            'window_hours': report['window_hours'],
+            'totals': reports.summarize(cars, report['window_hours']),
+            'cars': cars,
+            'drivers': drivers,
+        })
+
 class ClientDriverChatViewSet(viewsets.ModelViewSet):
     serializer_class = ClientDriverChatSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ProfileJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         return ClientDriverChat.objects.filter(
             Q(sender=self.request.user) | Q(receiver=self.request.user)
-        ).select_related("chat_room", "chat_room__job_post", "chat_room__client", "chat_room__driver")
+        ).select_related("chat_room")
 
     def perform_create(self, serializer):
         user = self.request.user
         job_post = serializer.validated_data["job_post"]
-        client = job_post.client
         driver = serializer.validated_data["driver"]
 
-        if user not in [client.user, driver.user]:
+        if user.pk not in [job_post.client_id, driver.pk]:
             raise PermissionDenied("You can only chat if you are the job's client or a bidding driver.")
 
-        receiver = client.user if user == driver.user else driver.user
-        chat_room, created = ChatRoom.objects.get_or_create(
-            job_post=job_post, client=client, driver=driver
+        # Opens the room on the first message and reuses it afterwards. Clients that
+        # know the room should post to /api/chatrooms/{chat_id}/messages/ instead.
+        chat_room, _ = ChatRoom.objects.get_or_create(
+            job_post=job_post, client_id=job_post.client_id, driver=driver
+        )
+        serializer.save(
+            sender=user, receiver_id=chat_room.other_participant_id(user.pk), chat_room=chat_room
         )
-
-        if not created:
-            raise ValidationError("A chat already exists for this job between the client and driver.")
-
-        serializer.save(sender=user, receiver=receiver, chat_room=chat_room)
 
     @action(detail=True, methods=["POST"], permission_classes=[permissions.IsAuthenticated])
     def mark_as_read(self, request, pk=None):
@@ -259,29 +658,211 @@ class ClientDriverChatViewSet(viewsets.ModelViewSet):
         chat.mark_as_read()
         return Response({"status": "Message marked as read."})
 
-class CarDocViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["GET"], url_path="unread-summary",
+            authentication_classes=[StatelessJWTAuthentication])
+    def unread_summary(self, request):
+        """
+        GET /api/chats/unread-summary/ -> { total, rooms: [{ chat_id, unread }] }
+        Read from the per-room counters in a single query.
+        """
+        rows = ChatUnreadCounter.objects.filter(user_id=request.user.pk, count__gt=0).values_list(
+            "chat_room__chat_id", "count"
+        )
+        rooms = [{"chat_id": chat_id, "unread": count} for chat_id, count in rows]
+        return Response({
+            "total": sum(room["unread"] for room in rooms),
+            "rooms": UnreadRoomSerializer(rooms, many=True).data,
+        })
+
+def participant_room(chat_id, user_pk):
+    """The room via the participants cache; 404 unless user_pk is in it."""
+    room = ChatRoom.from_participants(chat_id)
+    if room is None or user_pk not in (room.client_id, room.driver_id):
+        raise Http404
+    return room
+
+
+def message_sync_payload(messages, has_more, after):
+    return {
+        "results": ChatMessageSerializer(messages, many=True).data,
+        "next_after": messages[-1].pk if messages else after,
+        "has_more": has_more,
+    }
+
+
+class ChatRoomViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = ChatRoomSerializer
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    lookup_field = "chat_id"
+
+    def get_queryset(self):
+        user_pk = self.request.user.pk
+        return ChatRoom.objects.filter(Q(client_id=user_pk) | Q(driver_id=user_pk))
+
+    def create(self, request, *args, **kwargs):
+        """
+        POST /api/chatrooms/  { job_post, driver }
+        Idempotent: 201 with a new room, 200 with the room that already exists.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job_post = serializer.validated_data["job_post"]
+        driver = serializer.validated_data["driver"]
+        if request.user.pk not in [job_post.client_id, driver.pk]:
+            raise PermissionDenied("You can only chat if you are the job's client or a bidding driver.")
+        room, created = ChatRoom.objects.get_or_create(
+            job_post=job_post, client_id=job_post.client_id, driver=driver
+        )
+        return Response(
+            self.get_serializer(room).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    def get_participant_room(self, user_pk):
+        try:
+            chat_id = uuid.UUID(str(self.kwargs[self.lookup_field]))
+        except ValueError:
+            raise Http404
+        return participant_room(chat_id, user_pk)
+
+    @action(detail=True, methods=["GET", "POST"], serializer_class=ChatMessageSerializer)
+    def messages(self, request, chat_id=None):
+        """
+        GET  /api/chatrooms/{chat_id}/messages/?after=<id>&limit=  -> { results, next_after, has_more }
+        POST /api/chatrooms/{chat_id}/messages/  { message }
+        Membership comes from the cached participants. GET is a range scan on
+        (chat_room, id); POST costs the message INSERT plus the receiver's
+        unread counter update.
+        """
+        room = self.get_participant_room(request.user.pk)
+        if request.method == "GET":
+            params = MessageSyncQuerySerializer(data=request.query_params)
+            params.is_valid(raise_exception=True)
+            messages, has_more = room.messages_after(params.validated_data["after"], params.validated_data["limit"])
+            return Response(message_sync_payload(messages, has_more, params.validated_data["after"]))
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(
+            chat_room=room, sender_id=request.user.pk, receiver_id=room.other_participant_id(request.user.pk)
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["POST"])
+    def read(self, request, chat_id=None):
+        """
+        POST /api/chatrooms/{chat_id}/read/  { up_to_id?, up_to? } -> { marked }
+        Flips every earlier unread message addressed to the caller in one UPDATE.
+        """
+        room = self.get_object()
+        params = ReadWatermarkSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        marked = room.mark_read_up_to(
+            request.user.pk,
+            up_to_id=params.validated_data.get("up_to_id"),
+            up_to=params.validated_data.get("up_to"),
+        )
+        return Response({"marked": marked})
+
+class ChatMessagePollView(View):
+    """
+    GET /api/chatrooms/{chat_id}/messages/poll/?after=<id>&limit=&timeout=
+    Long-poll variant of ChatRoomViewSet.messages: answers at once if there are
+    messages after `after`, otherwise waits on the room's channel-layer group
+    (see core/realtime.py) until one is published or `timeout` seconds pass.
+    Async, so under ASGI a waiting client holds no worker thread.
+    """
+    authentication = StatelessJWTAuthentication()
+
+    async def get(self, request, chat_id):
+        # Stateless authentication only decodes the token, so it is safe to call here.
+        try:
+            authenticated = self.authentication.authenticate(request)
+        except AuthenticationFailed as exc:
+            # Same body DRF would render for the exception.
+            return JsonResponse(exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}, status=401)
+        if authenticated is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        user = authenticated[0]
+
+        params = MessageSyncQuerySerializer(data=request.GET)
+        if not params.is_valid():
+            return JsonResponse(params.errors, status=400)
+        after, limit, timeout = (params.validated_data[k] for k in ("after", "limit", "timeout"))
+
+        try:
+            room = await sync_to_async(participant_room)(chat_id, user.pk)
+        except Http404:
+            return JsonResponse({"detail": "Not found."}, status=404)
+        fetch = sync_to_async(room.messages_after)
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None or timeout == 0:
+            return JsonResponse(message_sync_payload(*await fetch(after, limit), after))
+
+        # Subscribe before the first read so a message committed in between isn't missed.
+        group = chat_group_name(chat_id)
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(group, channel)
+        try:
+            messages, has_more = await fetch(after, limit)
+            if not messages:
+                try:
+                    await asyncio.wait_for(channel_layer.receive(channel), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                else:
+                    messages, has_more = await fetch(after, limit)
+        finally:
+            await channel_layer.group_discard(group, channel)
+        return JsonResponse(message_sync_payload(messages, has_more, after))
+
+class CarDocViewSet(StagedUploadMixin, viewsets.ModelViewSet):
     serializer_class = CarDocSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    staged_file_fields = ("carinsurance", "car_license", "technical_control", "yellow_card")
 
     def get_queryset(self):
         if self.request.user.role == 'driver':
-            driver = Driver.objects.get(user=self.request.user)
+            driver = self.request.driver
             return CarDoc.objects.filter(driver=driver)
         return CarDoc.objects.all()
 
     def perform_create(self, serializer):
         if self.request.user.role != 'driver':
             raise PermissionDenied("Only drivers can add car documents")
-        driver = Driver.objects.get(user=self.request.user)
+        driver = self.request.driver
         car = serializer.validated_data.get('car')
-        if car.driver != driver:
+        if car.driver_id != driver.pk:
             raise PermissionDenied("You can only add documents for your own car")
-        serializer.save(driver=driver)
+        self.save_staged(serializer, driver=driver)
+
+    def perform_update(self, serializer):
+        self.save_staged(serializer)
+
+    @action(detail=True, methods=["GET"])
+    def uploads(self, request, pk=None):
+        """GET /api/cardocs/{id}/uploads/ -> status of every file uploaded for this document."""
+        doc = self.get_object()
+        rows = PendingUpload.objects.filter(
+            content_type=ContentType.objects.get_for_model(CarDoc), object_id=doc.pk
+        )
+        return Response(PendingUploadSerializer(rows, many=True).data)
+
+class PendingUploadViewSet(viewsets.ReadOnlyModelViewSet):
+    """GET /api/uploads/[{id}/] -> staged uploads of the caller and their transfer status."""
+    serializer_class = PendingUploadSerializer
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return PendingUpload.objects.filter(owner_id=self.request.user.pk)
 
 class NotificationViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ProfileJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -290,17 +871,32 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class TripViewSet(viewsets.ModelViewSet):
+class TripViewSet(ExportMixin, viewsets.ModelViewSet):
     serializer_class = TripSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    export_name = "trips"
+    export_columns = (
+        ("id", "pk"),
+        ("created_at", "created_at"),
+        ("job_offer", "job_offer_id"),
+        ("job_post", "job_offer__job_post_id"),
+        ("job_title", "job_offer__job_post__title"),
+        ("client", "job_offer__job_post__client_id"),
+        ("driver", "job_offer__accepted_bid__driver_id"),
+        ("car", "job_offer__car_id"),
+        ("actual_pickup_time", "actual_pickup_time"),
+        ("actual_dropoff_time", "actual_dropoff_time"),
+        ("distance_travelled", "distance_travelled"),
+        ("is_delivered", "is_delivered"),
+    )
 
     def get_queryset(self):
         if self.request.user.role == 'driver':
-            driver = Driver.objects.get(user=self.request.user)
-            return Trip.objects.filter(job_offer__driver=driver)
+            driver = self.request.driver
+            return Trip.objects.filter(job_offer__accepted_bid__driver=driver)
         elif self.request.user.role == 'client':
-            client = Client.objects.get(user=self.request.user)
+            client = self.request.client
             return Trip.objects.filter(job_offer__job_post__client=client)
         return Trip.objects.all()
 
@@ -324,7 +920,11 @@ class RegisterView(CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        staged = []
+        if serializer.validated_data.get('personalID'):
+            # Stored by a background worker; poll GET /api/uploads/{id}/.
+            staged.append(uploads.stage(user.driver, 'personalID', serializer.validated_data['personalID'], user.pk))
+        refresh = MyTokenObtainPairSerializer.get_token(user)
         return Response({
             'tokens': {
                 'refresh': str(refresh),
@@ -334,5 +934,6 @@ class RegisterView(CreateAPIView):
                 'id': user.id,
                 'username': user.username,
                 'role': user.role,
-            }
+            },
+            'uploads': PendingUploadSerializer(staged, many=True).data,
         }, status=status.HTTP_201_CREATED)
\ No newline at end of file